@@ -64,6 +64,14 @@ def get_all_ec_stats(
     )
 
 
+def _get_all_ec_stats_task(
+    task: tuple[Data, torch.Tensor, float], *, pt_thld: float
+) -> dict[str, float]:
+    """Unpack a (data, w, threshold) task for `get_all_ec_stats`."""
+    data, w, threshold = task
+    return get_all_ec_stats(threshold, w=w, data=data, pt_thld=pt_thld)
+
+
 def collect_all_ec_stats(
     model: torch.nn.Module,
     data_loader: DataLoader,
@@ -86,30 +94,38 @@ def collect_all_ec_stats(
         DataFrame with columns as in `get_all_ec_stats`
     """
     model.eval()
-    r = []
+    outputs = []
     with torch.no_grad():
         for idx, data in enumerate(data_loader):
-            w = model(data)["W"]
-            r += process_map(
-                partial(get_all_ec_stats, w=w, data=data, pt_thld=pt_thld),
-                thresholds,
-                max_workers=max_workers,
-            )
+            outputs.append((data, model(data)["W"]))
             if n_batches is not None and idx >= n_batches - 1:
                 break
+    # Evaluate all (batch, threshold) pairs in one pool rather than starting a
+    # new pool (and waiting for its slowest task) for every batch.
+    # Results are ordered by batch, then threshold.
+    tasks = [(data, w, threshold) for data, w in outputs for threshold in thresholds]
+    r = process_map(
+        partial(_get_all_ec_stats_task, pt_thld=pt_thld),
+        tasks,
+        max_workers=max_workers,
+        # Keep the tasks of the same batch together so that each batch is only
+        # sent to the workers once
+        chunksize=len(thresholds),
+    )
 
-    r_averaged = []
+    keys = list(r[0])
     n_batches = len(r) // len(thresholds)
-    for i in range(len(thresholds)):
-        batched = {k: np.array([x[k] for x in r[i :: len(thresholds)]]) for k in r[0]}
-        r_averaged.append(
-            {k: np.mean(batch) for k, batch in batched.items()}
-            | {
-                f"{k}_err": np.std(batch) / np.sqrt(n_batches)
-                for k, batch in batched.items()
-            }
-        )
-    return pd.DataFrame.from_records(r_averaged)
+    # A single array of shape (batch, threshold, metric) rather than one array per
+    # threshold and metric
+    values = np.array([[x[k] for k in keys] for x in r], dtype=float).reshape(
+        n_batches, len(thresholds), len(keys)
+    )
+    return pd.DataFrame(
+        np.concatenate(
+            [values.mean(axis=0), values.std(axis=0) / np.sqrt(n_batches)], axis=1
+        ),
+        columns=keys + [f"{k}_err" for k in keys],
+    )
 
 
 class ThresholdTrackInfoPlot:
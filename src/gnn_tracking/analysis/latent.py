@@ -3,13 +3,43 @@
 from typing import Callable, Sequence
 
 import matplotlib.pyplot as plt
+import numba
 import numpy as np
 import torch
+from matplotlib.collections import EllipseCollection
 from torch import Tensor as T
 
 from gnn_tracking.utils.colors import lighten_color
 from gnn_tracking.utils.log import logger
 
+#: Up to this number of labels, `isin_labels` uses a linear scan instead of
+#: `torch.isin`
+_MAX_LINEAR_SCAN_LABELS = 16
+
+
+@numba.njit(cache=True)
+def _mask_by_labels(labels: np.ndarray, assoc: np.ndarray) -> np.ndarray:
+    """Linear-scan version of `np.isin` that is faster for small `assoc`."""
+    out = np.zeros(labels.shape[0], np.bool_)
+    for i in range(labels.shape[0]):
+        x = labels[i]
+        for j in range(assoc.shape[0]):
+            if x == assoc[j]:
+                out[i] = True
+                break
+    return out
+
+
+def isin_labels(labels: T, assoc_labels: T) -> T:
+    """Mask of all `labels` that are in `assoc_labels`. Same as `torch.isin`, but
+    uses a JIT-compiled linear scan if there are only few `assoc_labels`.
+    """
+    if labels.is_cuda or len(assoc_labels) > _MAX_LINEAR_SCAN_LABELS:
+        return torch.isin(labels, assoc_labels)
+    labels_np = labels.detach().numpy()
+    assoc_np = assoc_labels.detach().numpy().astype(labels_np.dtype)
+    return torch.from_numpy(_mask_by_labels(labels_np, assoc_np))
+
 
 def get_color_mapper(
     selected_values: Sequence, colors: Sequence | None = None
@@ -25,13 +55,22 @@ def get_color_mapper(
         )
         raise ValueError(_)
 
-    # cm = np.vectorize(colors.__getitem__)
-    # vm = np.vectorize({p.item(): i for i, p in enumerate(selected_values)}.get)
-
-    color_map = {p.item(): colors[i] for i, p in enumerate(selected_values)}
+    # Sort the keys once so that the lookup becomes a single `searchsorted` call
+    keys = torch.as_tensor(selected_values).detach().cpu().numpy()
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    # Assign element-wise, `np.array` would turn RGB(A) tuples into a 2D array
+    colors_arr = np.empty(len(keys), dtype=object)
+    for i, j in enumerate(order):
+        colors_arr[i] = colors[j]
 
     def mapper(values):
-        return np.array([color_map.get(v.item()) for v in values])
+        values = torch.as_tensor(values).detach().cpu().numpy()
+        if len(sorted_keys) == 0:
+            return np.full(len(values), None, dtype=object)
+        idx = np.searchsorted(sorted_keys, values).clip(max=len(sorted_keys) - 1)
+        valid = sorted_keys[idx] == values
+        return np.where(valid, colors_arr[idx], None)
 
     return mapper
 
@@ -54,19 +93,29 @@ class SelectedPidsPlot:
         selected PIDs).
 
         Args:
-            condensation_space:
-            particle_id:
-            labels:
+            condensation_space: Condensation space coordinates of the hits that
+                make it to the condensation space
+            particle_id: Particle IDs of all hits
+            labels: Cluster labels of the hits in the condensation space (i.e.,
+                with `ec_hit_mask` already applied, like `condensation_space`)
             selected_pids:
             ec_hit_mask: If we do orphan node prediction, we need to know which hits
                 make it to the condensation space
-            input_node_features
+            input_node_features: Node features of all hits
         """
-        if ec_hit_mask is None:
-            ec_hit_mask = torch.ones_like(particle_id).bool()
+        if ec_hit_mask is None or ec_hit_mask.all():
+            # Slicing is a no-op, so avoid copying all per-hit tensors
+            ec_hit_mask = slice(None)
         self._ec_hit_mask = ec_hit_mask
         self._x = condensation_space
         self._pids = particle_id[self._ec_hit_mask]
+        if labels is not None and len(labels) != len(self._pids):
+            msg = (
+                f"Got {len(labels)} cluster labels, but {len(self._pids)} hits in "
+                f"the condensation space. Labels must be given for the hits in the "
+                f"condensation space only."
+            )
+            raise ValueError(msg)
         self._labels = labels
         if selected_pids is None:
             logger.warning(
@@ -85,24 +134,84 @@ class SelectedPidsPlot:
         self._phi = input_node_features[self._ec_hit_mask, 3]
         self._eta = input_node_features[self._ec_hit_mask, 1]
 
+        #: Hit indices sorted by PID, so that the hits of a PID can be found by
+        #: bisection rather than by a full scan
+        self._pid_sorted_idx = torch.argsort(self._pids)
+        self._sorted_pids = self._pids[self._pid_sorted_idx]
+        self._collateral_cache: dict[int, T] = {}
+        self._collateral_hits: tuple[T, T] | None = None
+
+    def _get_pid_hit_idx(self, pid: int) -> T:
+        """Indices of all hits belonging to this particle ID."""
+        pid_t = torch.as_tensor(pid, dtype=self._sorted_pids.dtype).reshape(1)
+        start = torch.searchsorted(self._sorted_pids, pid_t).item()
+        stop = torch.searchsorted(self._sorted_pids, pid_t, right=True).item()
+        return self._pid_sorted_idx[start:stop]
+
     def get_collateral_mask(self, pid: int) -> T:
         """Mask for hits that are in the same cluster(s) as the hits belonging to this
         particle ID.
         """
         assert self._labels is not None
-        pid_mask = self._pids == pid
-        assoc_labels = torch.unique(self._labels[pid_mask])
-        label_mask = torch.isin(self._labels, assoc_labels)
-        return label_mask & (~pid_mask)
+        key = int(pid)
+        if key in self._collateral_cache:
+            return self._collateral_cache[key]
+        pid_idx = self._get_pid_hit_idx(key)
+        assoc_labels = torch.unique(self._labels[pid_idx])
+        label_mask = isin_labels(self._labels, assoc_labels)
+        label_mask[pid_idx] = False
+        self._collateral_cache[key] = label_mask
+        return label_mask
+
+    def get_collateral_hits(self) -> tuple[T, T]:
+        """Collateral hits for all selected PIDs at once.
+
+        Returns:
+            Tuple of hit indices and the selected PID that each hit is collateral to.
+            A hit can appear several times if it is collateral to more than one
+            selected PID.
+        """
+        assert self._labels is not None
+        if self._collateral_hits is not None:
+            return self._collateral_hits
+        sel_mask = self._selected_pid_mask
+        if not sel_mask.any():
+            empty = torch.zeros(0, dtype=torch.long, device=self._pids.device)
+            self._collateral_hits = empty, empty
+            return self._collateral_hits
+        # Unique (label, pid) pairs of the selected hits, sorted by label
+        pairs = torch.unique(
+            torch.stack([self._labels[sel_mask].long(), self._pids[sel_mask].long()]),
+            dim=1,
+        )
+        pair_labels, pair_pids = pairs[0].contiguous(), pairs[1]
+        coll_idx = isin_labels(self._labels, pair_labels).nonzero().squeeze(1)
+        # Join every hit in an associated cluster with all PIDs of that cluster
+        coll_labels = self._labels[coll_idx].long()
+        start = torch.searchsorted(pair_labels, coll_labels)
+        n = torch.searchsorted(pair_labels, coll_labels, right=True) - start
+        hit_idx = torch.repeat_interleave(coll_idx, n)
+        first = torch.repeat_interleave(torch.cumsum(n, 0) - n, n)
+        offsets = torch.arange(len(hit_idx), device=hit_idx.device) - first
+        pid = pair_pids[torch.repeat_interleave(start, n) + offsets]
+        keep = self._pids[hit_idx] != pid
+        self._collateral_hits = hit_idx[keep], pid[keep]
+        return self._collateral_hits
 
     @staticmethod
     def plot_circles(ax: plt.Axes, xs: T, ys: T, colors, eps=1) -> None:
         assert xs.shape == ys.shape
-        for x, y, c in zip(xs, ys, colors):
-            circle = plt.Circle(
-                (x, y), eps, facecolor=lighten_color(c, 0.2), linestyle="none"
-            )
-            ax.add_patch(circle)
+        circles = EllipseCollection(
+            widths=2 * eps,
+            heights=2 * eps,
+            angles=0,
+            units="xy",
+            offsets=np.column_stack([np.asarray(xs), np.asarray(ys)]),
+            offset_transform=ax.transData,
+            facecolors=[lighten_color(c, 0.2) for c in colors],
+            linewidths=0,
+        )
+        ax.add_collection(circles)
 
     def get_colors(self, pids: T | Sequence) -> Sequence:
         return self._color_mapper(pids)
@@ -122,17 +231,16 @@ class SelectedPidsPlot:
         )
 
     def plot_collateral_latent(self, ax: plt.Axes) -> None:
-        for pid in self._selected_pids:
-            mask = self.get_collateral_mask(pid)
-            ax.scatter(
-                self._x[mask][:, 0],
-                self._x[mask][:, 1],
-                c=self.get_colors([pid]),
-                alpha=1,
-                label="Collateral",
-                s=12,
-                marker="x",
-            )
+        hit_idx, pid = self.get_collateral_hits()
+        ax.scatter(
+            self._x[hit_idx][:, 0],
+            self._x[hit_idx][:, 1],
+            c=self.get_colors(pid),
+            alpha=1,
+            label="Collateral",
+            s=12,
+            marker="x",
+        )
 
     def plot_other_hit_latent(self, ax: plt.Axes) -> None:
         mask = self._selected_pid_mask
@@ -166,13 +274,12 @@ class SelectedPidsPlot:
         )
 
     def plot_collateral_ep(self, ax: plt.Axes) -> None:
-        for pid in self._selected_pids:
-            mask = self.get_collateral_mask(pid)
-            ax.scatter(
-                self._phi[mask],
-                self._eta[mask],
-                c=self.get_colors([pid]),
-                alpha=1,
-                s=12,
-                marker="x",
-            )
+        hit_idx, pid = self.get_collateral_hits()
+        ax.scatter(
+            self._phi[hit_idx],
+            self._eta[hit_idx],
+            c=self.get_colors(pid),
+            alpha=1,
+            s=12,
+            marker="x",
+        )
@@ -138,8 +138,7 @@ class GraphBuilder:
         """Computes pseudorapidity
         (https://en.wikipedia.org/wiki/Pseudorapidity)
         """
-        theta = np.arctan2(r, z)
-        return -1.0 * np.log(np.tan(theta / 2.0))
+        return np.arcsinh(z / r)
 
     def get_dataframe(self, evt: Data, evtid: int) -> DF:
         """Converts pytorch geometric data object to pandas dataframe
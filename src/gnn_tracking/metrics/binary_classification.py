@@ -214,11 +214,13 @@ def roc_auc_score(
         return float("nan")
 
 
-def get_roc_auc_scores(true, predicted, max_fprs: Iterable[float | None]):
+def get_roc_auc_scores(true, predicted, max_fprs: Iterable[float | None], device=None):
     """Calculate ROC AUC scores for a given set of maximum FPRs."""
     metrics = {}
     if None in max_fprs:
-        metrics["roc_auc"] = roc_auc_score(y_true=true, y_score=predicted)
+        metrics["roc_auc"] = roc_auc_score(
+            y_true=true, y_score=predicted, device=device
+        )
     for max_fpr in max_fprs:
         if max_fpr is None:
             continue
@@ -226,6 +228,7 @@ def get_roc_auc_scores(true, predicted, max_fprs: Iterable[float | None]):
             y_true=true,
             y_score=predicted,
             max_fpr=max_fpr,
+            device=device,
         )
     return metrics
 
@@ -15,6 +15,7 @@ from torch_geometric.data import Data
 from gnn_tracking.utils.math import zero_division_gives_nan
 from gnn_tracking.utils.nomenclature import denote_pt
 from gnn_tracking.utils.signature import tolerate_additional_kwargs
+from gnn_tracking.utils.torch_utils import to_numpy
 
 
 class ClusterMetricType(Protocol):
@@ -277,12 +278,15 @@ def tracking_metrics_data(
             rejected.
         max_eta: Maximum eta value to count
     """
+    truth, pts, reconstructable, eta = to_numpy(
+        data.particle_id, data.pt, data.reconstructable, data.eta
+    )
     return tracking_metrics(
-        truth=data.particle_id.detach().cpu().numpy(),
+        truth=truth,
         predicted=labels,
-        pts=data.pt.detach().cpu().numpy(),
-        reconstructable=data.reconstructable.detach().cpu().numpy(),
-        eta=data.eta.detach().cpu().numpy(),
+        pts=pts,
+        reconstructable=reconstructable,
+        eta=eta,
         pt_thlds=pt_thlds,
         max_eta=max_eta,
         predicted_count_thld=predicted_count_thld,
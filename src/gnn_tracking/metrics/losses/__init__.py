@@ -2,6 +2,7 @@
 
 import copy
 from dataclasses import dataclass, field
+from functools import cached_property
 from typing import Any
 
 import torch
@@ -24,13 +25,15 @@ class MultiLossFctReturn:
     def __post_init__(self) -> None:
         assert self.loss_dct.keys() == self.weight_dct.keys()
 
-    @property
+    # Both properties are accessed several times per batch (for the backward pass
+    # and for logging), so they are only computed once.
+    @cached_property
     def loss(self) -> T:
         loss = sum(self.weighted_losses.values())
         assert isinstance(loss, torch.Tensor)
         return loss
 
-    @property
+    @cached_property
     def weighted_losses(self) -> dict[str, T]:
         return {k: v * self.weight_dct[k] for k, v in self.loss_dct.items()}
 
@@ -10,6 +10,7 @@ from gnn_tracking.models.mlp import MLP
 from gnn_tracking.models.resin import ResIN
 from gnn_tracking.utils.asserts import assert_feat_dim
 from gnn_tracking.utils.lightning import get_model
+from gnn_tracking.utils.torch_utils import clipped_sigmoid
 
 
 class ECForGraphTCN(nn.Module, HyperparametersMixin):
@@ -27,6 +28,7 @@ class ECForGraphTCN(nn.Module, HyperparametersMixin):
         use_intermediate_edge_embeddings: bool = True,
         use_node_embedding: bool = True,
         residual_kwargs: dict | None = None,
+        autocast: bool = False,  # noqa: ARG002
     ):
         """Edge classification step to be used for Graph Track Condensor network
         (Graph TCN)
@@ -52,6 +54,8 @@ class ECForGraphTCN(nn.Module, HyperparametersMixin):
             use_node_embedding: If true, feed node attributes to the final MLP for
                 EC
             residual_kwargs: Keyword arguments passed to `ResIN`
+            autocast: Run the network in bfloat16 autocast. All outputs are
+                returned in float32.
         """
         super().__init__()
         self.save_hyperparameters()
@@ -99,25 +103,28 @@ class ECForGraphTCN(nn.Module, HyperparametersMixin):
         x, edge_index, edge_attr = data.x, data.edge_index, data.edge_attr
         assert_feat_dim(x, self.hparams.node_indim)
         assert_feat_dim(edge_attr, self.hparams.edge_indim)
-        h_ec = self.relu(self.ec_node_encoder(x))
-        edge_attr_ec = self.relu(self.ec_edge_encoder(edge_attr))
-        h_ec, edge_attr_ec, edge_attrs_ec = self.ec_resin(
-            h_ec, edge_index, edge_attr_ec
-        )
-
-        w_input = edge_attr_ec
-        if self.hparams.use_intermediate_edge_embeddings:
-            w_input = torch.cat(edge_attrs_ec, dim=1)
-        if self.hparams.use_node_embedding:
-            h_ec_0 = h_ec[edge_index[0]]
-            h_ec_1 = h_ec[edge_index[1]]
-            w_input = torch.cat([h_ec_0, h_ec_1, w_input], dim=1)
-        eps = 0.001
-        edge_weights = eps + (1 - 2 * eps) * torch.sigmoid(self.W(w_input))
+        with torch.autocast(
+            x.device.type, dtype=torch.bfloat16, enabled=self.hparams.autocast
+        ):
+            h_ec = self.relu(self.ec_node_encoder(x))
+            edge_attr_ec = self.relu(self.ec_edge_encoder(edge_attr))
+            h_ec, edge_attr_ec, edge_attrs_ec = self.ec_resin(
+                h_ec, edge_index, edge_attr_ec
+            )
+
+            w_input = edge_attr_ec
+            if self.hparams.use_intermediate_edge_embeddings:
+                w_input = torch.cat(edge_attrs_ec, dim=1)
+            if self.hparams.use_node_embedding:
+                h_ec_0 = h_ec[edge_index[0]]
+                h_ec_1 = h_ec[edge_index[1]]
+                w_input = torch.cat([h_ec_0, h_ec_1, w_input], dim=1)
+            w_logits = self.W(w_input)
+        edge_weights = clipped_sigmoid(w_logits.float(), 0.001)
         return {
             "W": edge_weights.squeeze(),
-            "node_embedding": h_ec,
-            "edge_embedding": edge_attr_ec,
+            "node_embedding": h_ec.float(),
+            "edge_embedding": edge_attr_ec.float(),
         }
 
 
@@ -147,17 +154,13 @@ class PerfectEdgeClassification(nn.Module, HyperparametersMixin):
 
     def forward(self, data: Data) -> dict[str, Tensor]:
         r = data.y.bool()
-        if not np.isclose(self.tpr, 1.0):
-            true_mask = r.detach().clone()
-            rand = torch.rand(int(true_mask.sum()), device=r.device)
-            r[true_mask] = rand <= self.tpr
-        if not np.isclose(self.tnr, 1.0):
-            false_mask = (~r).detach().clone()
-            rand = torch.rand(int(false_mask.sum()), device=r.device)
-            r[false_mask] = ~(rand <= self.tnr)
+        if not (np.isclose(self.tpr, 1.0) and np.isclose(self.tnr, 1.0)):
+            # Elementwise instead of writing into masked selections: True edges
+            # are kept with probability TPR, false edges flipped with 1 - TNR
+            rand = torch.rand(r.shape, device=r.device)
+            r = torch.where(r, rand <= self.tpr, rand > self.tnr)
         if self.false_below_pt > 0.0:
-            false_mask = data.pt < self.false_below_pt
-            r[false_mask] = False
+            r &= data.pt >= self.false_below_pt
         # Return as float, because that's what a normal model would do
         # (and also what BCE expects)
         return {"W": r.float()}
@@ -1,3 +1,5 @@
+from typing import Optional
+
 import torch
 from pytorch_lightning.core.mixins.hparams_mixin import HyperparametersMixin
 from torch import Tensor as T
@@ -7,6 +9,51 @@ from torch_geometric.nn import MessagePassing
 from gnn_tracking.models.mlp import MLP
 from gnn_tracking.utils.asserts import assert_feat_dim
 
+#: Dtypes for which the sparse CSR matrix product is implemented on CPU
+_CSR_DTYPES = (torch.float32, torch.float64)
+
+
+def get_csr_layout(index: T, dim_size: int) -> tuple[T, T]:
+    """Get the layout of the CSR adjacency matrix that maps messages to their
+    target nodes.
+
+    Args:
+        index: Index of the target node of every message
+        dim_size: Number of target nodes
+
+    Returns:
+        Row pointers and column indices (the messages sorted by target node)
+    """
+    perm = torch.argsort(index, stable=True)
+    counts = torch.bincount(index, minlength=dim_size)
+    crow_indices = torch.zeros(dim_size + 1, dtype=torch.long, device=index.device)
+    torch.cumsum(counts, dim=0, out=crow_indices[1:])
+    return crow_indices, perm
+
+
+def csr_sum_aggregate(inputs: T, index: T, dim_size: int) -> T:
+    """Sum messages per target node by multiplying with a CSR adjacency matrix.
+
+    On CPU this is considerably faster than the scatter based aggregation,
+    because the sparse matrix product is multithreaded and works on sorted indices.
+
+    Args:
+        inputs: Messages (one per edge)
+        index: Index of the target node of every message
+        dim_size: Number of target nodes
+
+    Returns:
+        Aggregated messages (one per node)
+    """
+    crow_indices, perm = get_csr_layout(index, dim_size)
+    adjacency = torch.sparse_csr_tensor(
+        crow_indices,
+        perm,
+        torch.ones_like(perm, dtype=inputs.dtype),
+        size=(dim_size, len(index)),
+    )
+    return adjacency @ inputs
+
 
 # noinspection PyAbstractClass
 class InteractionNetwork(MessagePassing, HyperparametersMixin):
@@ -88,6 +135,29 @@ class InteractionNetwork(MessagePassing, HyperparametersMixin):
         assert self._e_tilde is not None  # mypy
         return self._e_tilde
 
+    def aggregate(
+        self,
+        inputs: T,
+        index: T,
+        # PyG's inspector does not support ``X | None`` annotations here
+        ptr: Optional[T] = None,
+        dim_size: Optional[int] = None,
+    ) -> T:
+        """Aggregate messages. Uses `csr_sum_aggregate` for float32/float64 sum
+        aggregation on CPU and falls back to the default implementation otherwise
+        (e.g., for bfloat16 messages under autocast). The CSR layout is built
+        from ``index`` in every call, so it follows the message flow.
+        """
+        if (
+            inputs.is_cuda
+            or inputs.dtype not in _CSR_DTYPES
+            or ptr is not None
+            or dim_size is None
+            or self.aggr != "add"
+        ):
+            return super().aggregate(inputs, index, ptr=ptr, dim_size=dim_size)
+        return csr_sum_aggregate(inputs, index, dim_size)
+
     # noinspection PyMethodOverriding
     def update(self, aggr_out: T, x: T) -> T:
         """Update for node embedding
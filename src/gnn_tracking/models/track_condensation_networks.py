@@ -10,7 +10,6 @@ import torch.nn as nn
 from pytorch_lightning.core.mixins.hparams_mixin import HyperparametersMixin
 from torch import Tensor
 from torch_geometric.data import Data
-from torch_geometric.utils import index_to_mask
 
 from gnn_tracking.models.dynamic_edge_conv import DynamicEdgeConv
 from gnn_tracking.models.edge_classifier import ECForGraphTCN, PerfectEdgeClassification
@@ -18,6 +17,7 @@ from gnn_tracking.models.interaction_network import InteractionNetwork as IN
 from gnn_tracking.models.mlp import MLP, HeterogeneousResFCNN, ResFCNN
 from gnn_tracking.models.resin import ResIN
 from gnn_tracking.utils.lightning import obj_from_or_to_hparams
+from gnn_tracking.utils.torch_utils import clipped_sigmoid
 
 
 class INConvBlock(nn.Module):
@@ -56,7 +56,10 @@ class INConvBlock(nn.Module):
     ) -> Tensor:
         h, edge_index = self.edge_conv(x)
         h = self.relu(h)
-        edge_attr = torch.cat([h[edge_index[0]], h[edge_index[1]]], dim=1)
+        # Gather source and target embeddings with a single indexing operation
+        # (equivalent to concatenating h[edge_index[0]] and h[edge_index[1]], but
+        # without the two intermediate tensors)
+        edge_attr = h[edge_index.T].flatten(start_dim=1)
         edge_attr = self.relu(self.edge_encoder(edge_attr))
 
         # apply the track condenser
@@ -76,19 +79,24 @@ class PointCloudTCN(nn.Module):
         hidden_dim=100,
         N_blocks=3,
         L=3,
+        autocast: bool = False,
     ):
         """Model to directly process point clouds rather than start with a graph.
 
         Args:
             node_indim:
-            h_dim:   node dimension in latent space
+            h_dim:   node dimension in latent space. Multiples of 8 make better
+                use of the vectorized matrix multiplication kernels.
             e_dim: edge dimension in latent space
             h_outdim:  output dimension in clustering space
             hidden_dim:  hidden with of all nn.Linear layers
             N_blocks:  number of edge_conv + IN blocks
             L: message passing depth in each block
+            autocast: Run the network in bfloat16 autocast (outputs are
+                returned in float32)
         """
         super().__init__()
+        self._autocast = autocast
 
         layers = [INConvBlock(node_indim, h_dim, e_dim, L=L, k=N_blocks)]
         for i in range(N_blocks):
@@ -105,12 +113,17 @@ class PointCloudTCN(nn.Module):
         alpha: float = 0.5,
     ) -> dict[str, Tensor | None]:
         # apply the edge classifier to generate edge weights
-        h = data.x
-        for layer in self.layers:
-            h = layer(h)
-
-        beta = torch.sigmoid(self.B(h)).squeeze() + 10e-12
-        h_out = self.X(h)
+        with torch.autocast(
+            data.x.device.type, dtype=torch.bfloat16, enabled=self._autocast
+        ):
+            h = data.x
+            for layer in self.layers:
+                h = layer(h)
+            beta_logits = self.B(h)
+            h_out = self.X(h)
+
+        beta = torch.sigmoid(beta_logits.float()).squeeze() + 10e-12
+        h_out = h_out.float()
 
         return {"W": None, "H": h_out, "B": beta, "P": None}
 
@@ -135,6 +148,7 @@ class ModularGraphTCN(nn.Module, HyperparametersMixin):
         alpha_latent: float = 0.0,
         n_embedding_coords: int = 0,
         heterogeneous_node_encoder: bool = False,
+        autocast: bool = False,
     ):
         """Track condensation network based on preconstructed graphs. This module
         combines the following:
@@ -157,7 +171,9 @@ class ModularGraphTCN(nn.Module, HyperparametersMixin):
             hidden_dim: width of hidden layers in all perceptrons
             feed_edge_weights: whether to feed edge weights to the track condenser
             ec_threshold: threshold for edge classification
-            mask_orphan_nodes: Mask nodes with no connections after EC
+            mask_orphan_nodes: Mask nodes with no connections after EC. If
+                disabled, the ``ec_hit_mask`` output is None (no nodes masked),
+                so that the losses do not need to apply a trivial mask.
             use_ec_embeddings_for_hc: Use edge classifier embeddings as input to
                 track condenser. This currently assumes that h_dim and e_dim are
                 also the dimensions used in the EC.
@@ -167,6 +183,8 @@ class ModularGraphTCN(nn.Module, HyperparametersMixin):
             n_embedding_coords: Number of embedding coordinates for which to add a
                 residual connection. To be used with `alpha_latent`.
             heterogeneous_node_encoder: Whether to use different encoders for pixel/strip
+            autocast: Run the track condenser in bfloat16 autocast. The edge
+                classifier and all outputs stay in float32.
         """
         super().__init__()
         self.save_hyperparameters(ignore=["ec", "hc_in"])
@@ -254,13 +272,13 @@ class ModularGraphTCN(nn.Module, HyperparametersMixin):
             if self.hparams.mask_orphan_nodes:
                 # Edge features do not need to be updated since there
                 # are no loops (not affected by labeling)
-                connected_nodes = data.edge_index.flatten().unique()
-                hit_mask = index_to_mask(connected_nodes, size=data.num_nodes)
-                data = data.subgraph(connected_nodes)
-            else:
-                hit_mask = torch.ones(
-                    data.num_nodes, dtype=torch.bool, device=data.x.device
+                # Scattering into a mask avoids sorting the edge index (as
+                # `unique` would); subgraph relabels the nodes on device.
+                hit_mask = torch.zeros(
+                    data.num_nodes, dtype=torch.bool, device=data.edge_index.device
                 )
+                hit_mask[data.edge_index.flatten()] = True
+                data = data.subgraph(hit_mask)
         if self.ec is None and self.hparams.feed_edge_weights:
             data.edge_weights = data.ec_score.reshape((-1, 1))
 
@@ -274,20 +292,25 @@ class ModularGraphTCN(nn.Module, HyperparametersMixin):
             _xs.append(data.ec_node_embedding)
         if self.hparams.feed_edge_weights:
             _edge_attrs.append(data.edge_weights)
-        x = torch.cat(_xs, dim=1)
-        edge_attrs = torch.cat(_edge_attrs, dim=1)
-        h_hc = self.relu(self.hc_node_encoder(x, layer=data.layer))
-        edge_attr_hc = self.relu(self.hc_edge_encoder(edge_attrs))
-
-        # Run the track condenser
-        h_hc, _, _ = self.hc_in(h_hc, data.edge_index, edge_attr_hc)
-        beta = torch.sigmoid(self.p_beta(h_hc))
+        # Avoid a copy if there is nothing to concatenate
+        x = torch.cat(_xs, dim=1) if len(_xs) > 1 else _xs[0]
+        edge_attrs = (
+            torch.cat(_edge_attrs, dim=1) if len(_edge_attrs) > 1 else _edge_attrs[0]
+        )
+        with torch.autocast(
+            x.device.type, dtype=torch.bfloat16, enabled=self.hparams.autocast
+        ):
+            h_hc = self.relu(self.hc_node_encoder(x, layer=data.layer))
+            edge_attr_hc = self.relu(self.hc_edge_encoder(edge_attrs))
+
+            # Run the track condenser
+            h_hc, _, _ = self.hc_in(h_hc, data.edge_index, edge_attr_hc)
+            beta_logits = self.p_beta(h_hc)
+            h = self.p_cluster(h_hc)
         # Soft clipping to protect against nans when calling arctanh(beta)
+        beta = clipped_sigmoid(beta_logits.float(), 1e-6)
         assert not torch.isnan(beta).any()
-        epsilon = 1e-6
-        beta = epsilon + (1 - 2 * epsilon) * beta
-
-        h = self.p_cluster(h_hc)
+        h = h.float()
         if alpha_residue := self.hparams.alpha_latent:
             nec: int = self.hparams.n_embedding_coords
             assert nec > 0
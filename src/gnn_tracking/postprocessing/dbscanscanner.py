@@ -15,6 +15,7 @@ from gnn_tracking.metrics.cluster_metrics import (
 from gnn_tracking.postprocessing.clusterscanner import ClusterScanner
 from gnn_tracking.postprocessing.fastrescanner import DBSCANFastRescan
 from gnn_tracking.utils.dictionaries import add_key_prefix
+from gnn_tracking.utils.torch_utils import to_numpy
 
 # For parameters saved as lightning hyperparameters
 # ruff: noqa: ARG002
@@ -108,13 +109,18 @@ class DBSCANHyperParamScanner(ClusterScanner):
         # todo: this is for backwards compatibility, remove in future
         self.hparams.guide = self.hparams.guide.removeprefix("trk.")
         self._results = []
-        self._rng = np.random.default_rng()
+        #: Results as `OCScanResults`, built lazily from `_results`
+        self._scan_results: OCScanResults | None = None
         self._trials = []
         self._rng = np.random.default_rng()
         self.reset()
 
     def get_results(self) -> OCScanResults:
-        return OCScanResults(pd.DataFrame.from_records(self._results))
+        # Both `get_foms` (end of epoch) and `_reset_trials` (start of next epoch)
+        # need the aggregated results, so only build the dataframe once
+        if self._scan_results is None:
+            self._scan_results = OCScanResults(pd.DataFrame.from_records(self._results))
+        return self._scan_results
 
     def get_foms(self) -> dict[str, float]:
         return self.get_results().get_foms()
@@ -133,7 +139,12 @@ class DBSCANHyperParamScanner(ClusterScanner):
             self.hparams.min_samples_range[1] + 1,
             size=size_random,
         )
-        self._trials = [{"eps": e, "min_samples": n} for e, n in zip(eps, min_samples)]
+        # Convert to python scalars once, rather than carrying numpy scalars through
+        # every trial and result record
+        self._trials = [
+            {"eps": e, "min_samples": n}
+            for e, n in zip(eps.tolist(), min_samples.tolist())
+        ]
 
     def reset(self):
         """Reset the results. Will be automatically called every time we run on
@@ -142,6 +153,7 @@ class DBSCANHyperParamScanner(ClusterScanner):
         self._reset_trials()
         self._best_trials = []
         self._results = []
+        self._scan_results = None
 
     def __call__(
         self,
@@ -158,8 +170,13 @@ class DBSCANHyperParamScanner(ClusterScanner):
             raise NotImplementedError(msg)
         if i_batch == 0:
             self.reset()
+        # The truth information is the same for all trials, so only transfer it
+        # once (and together with the latent space)
+        h, truth, pts, eta, reconstructable = to_numpy(
+            out["H"], data.particle_id, data.pt, data.eta, data.reconstructable
+        )
         scanner = DBSCANFastRescan(
-            out["H"].detach().cpu().numpy(),
+            h,
             max_eps=max(v["eps"] for v in self._trials),
             n_jobs=self.hparams.n_jobs,
         )
@@ -169,11 +186,11 @@ class DBSCANHyperParamScanner(ClusterScanner):
         for trial in iterator:
             labels = scanner.cluster(eps=trial["eps"], min_pts=trial["min_samples"])
             metrics = tracking_metrics(
-                truth=data.particle_id.detach().cpu().numpy(),
+                truth=truth,
                 predicted=labels,
-                pts=data.pt.detach().cpu().numpy(),
-                eta=data.eta.detach().cpu().numpy(),
-                reconstructable=data.reconstructable.detach().cpu().numpy(),
+                pts=pts,
+                eta=eta,
+                reconstructable=reconstructable,
                 pt_thlds=self.hparams.pt_thlds,
                 max_eta=self.hparams.max_eta,
             )
@@ -185,6 +202,7 @@ class DBSCANHyperParamScanner(ClusterScanner):
                     **flatten_track_metrics(metrics),
                 }
             )
+        self._scan_results = None
 
 
 class DBSCANHyperParamScannerFixed(DBSCANHyperParamScanner):
@@ -227,21 +245,21 @@ class DBSCANPerformanceDetails(DBSCANHyperParamScanner):
         self._c_dfs = []
 
     def __call__(self, data: Data, out: dict[str, T], i_batch: int) -> None:
-        def prep(tensor):
-            return tensor.detach().cpu().numpy()
-
+        h, particle_id, reconstructable, pt, eta = to_numpy(
+            out["H"], data.particle_id, data.reconstructable, data.pt, data.eta
+        )
         labels = dbscan(
-            out["H"].detach().cpu().numpy(),
+            h,
             eps=self.hparams.eps,
             min_samples=self.hparams.min_samples,
         )
         h_df = pd.DataFrame(
             {
                 "c": labels,
-                "id": prep(data.particle_id),
-                "reconstructable": prep(data.reconstructable),
-                "pt": prep(data.pt),
-                "eta": prep(data.eta),
+                "id": particle_id,
+                "reconstructable": reconstructable,
+                "pt": pt,
+                "eta": eta,
             }
         )
         c_df = tracking_metric_df(h_df)
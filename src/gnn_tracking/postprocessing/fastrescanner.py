@@ -15,11 +15,13 @@ class DBSCANFastRescan:
                 as possible to save time.
             n_jobs: The number of parallel jobs to run.
         """
-        self.x = x
+        # C-contiguous input for the neighbor search
+        self.x = np.ascontiguousarray(x)
         self._max_eps = max_eps
         self._n_jobs = n_jobs
         self._distances = None
-        self._edges = None
+        self._sources = None
+        self._targets = None
         self._reset_graph(max_eps)
 
     def _reset_graph(self, max_eps: float) -> None:
@@ -35,7 +37,12 @@ class DBSCANFastRescan:
         target_indexes = np.concatenate(indexes)
 
         self._distances = np.concatenate(distances)
-        self._edges = np.column_stack((source_indexes, target_indexes))
+        # Sources and targets are stored as separate contiguous arrays rather than
+        # as columns of one array, so that filtering them does not need strided
+        # memory access
+        self._sources = source_indexes
+        self._targets = target_indexes
+        self._max_eps = max_eps
 
     def cluster(self, eps: float = 1.0, min_pts: int = 1):
         """Perform clustering on given data with DBSCAN
@@ -47,13 +54,15 @@ class DBSCANFastRescan:
         if eps > self._max_eps:
             self._reset_graph(eps)
 
-        filtered_edges = self._edges[self._distances <= eps]
+        edge_mask = self._distances <= eps
+        sources = self._sources[edge_mask]
+        targets = self._targets[edge_mask]
 
-        n_neighbors = np.bincount(filtered_edges[:, 0])
+        n_neighbors = np.bincount(sources, minlength=len(self.x))
         core_samples = np.asarray(n_neighbors >= min_pts, dtype=np.uint8)
 
-        idx = np.where(np.diff(filtered_edges[:, 0]) != 0)[0] + 1
-        n = np.split(filtered_edges[:, 1], idx)
+        # Sources are sorted, so the neighborhoods are contiguous slices of targets
+        n = np.split(targets, np.cumsum(n_neighbors)[:-1])
         neighborhoods = np.empty(len(n), dtype=object)
 
         for i in range(len(n)):
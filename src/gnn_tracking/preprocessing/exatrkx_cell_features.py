@@ -174,10 +174,15 @@ def theta_to_eta(theta):
 def get_all_local_angles(hits: DF, cells: DF, detector: dict) -> tuple[S, S, S]:
     """Adapted/copied from ExaTrkX's preprocessing. See docstring above."""
 
-    direction_count_u = cells.groupby(["hit_id"]).ch0.agg(["min", "max"])
-    direction_count_v = cells.groupby(["hit_id"]).ch1.agg(["min", "max"])
-    nb_u = direction_count_u["max"] - direction_count_u["min"] + 1
-    nb_v = direction_count_v["max"] - direction_count_v["min"] + 1
+    # Single pass over the cells for all channel extents
+    direction_count = cells.groupby(["hit_id"]).agg(
+        u_min=("ch0", "min"),
+        u_max=("ch0", "max"),
+        v_min=("ch1", "min"),
+        v_max=("ch1", "max"),
+    )
+    nb_u = direction_count["u_max"] - direction_count["u_min"] + 1
+    nb_v = direction_count["v_max"] - direction_count["v_min"] + 1
 
     vols = hits["volume_id"].to_numpy()
     layers = hits["layer_id"].to_numpy()
@@ -252,12 +257,9 @@ def extract_dir_new(hits: DF, cells: DF, detector: dict) -> DF:
 
 def augment_hit_features(hits: DF, cells: DF, detector_proc: dict):
     """Adapted/copied from ExaTrkX's preprocessing. See docstring above."""
-    hits["cell_count"] = (
-        cells.groupby(["hit_id"]).value.count().to_numpy().astype(np.float32)
-    )
-    hits["cell_val"] = (
-        cells.groupby(["hit_id"]).value.sum().to_numpy().astype(np.float32)
-    )
+    cell_agg = cells.groupby(["hit_id"]).value.agg(["count", "sum"])
+    hits["cell_count"] = cell_agg["count"].to_numpy().astype(np.float32)
+    hits["cell_val"] = cell_agg["sum"].to_numpy().astype(np.float32)
     angles = extract_dir_new(hits, cells, detector_proc)
     # Drop duplicate columns before merging to avoid suffixes
     hits = pd.merge(
@@ -1,20 +1,33 @@
 """Build point clouds from the input data files."""
 
-import collections
+import copy
+import hashlib
+import json
 import logging
+import multiprocessing
 import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path, PurePath
 from typing import Any
 
+import numba
 import numpy as np
 import pandas as pd
 import torch
 from torch_geometric.data import Data
+from tqdm import tqdm
 
 import gnn_tracking.preprocessing.exatrkx_cell_features as ecf
 from gnn_tracking.utils.log import get_logger
 
-pd.options.mode.chained_assignment = None  # default='warn'
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+#: Bump this whenever the hit features written to the cache change
+_HIT_CACHE_VERSION = 1
 
 
 def get_truth_edge_index(pids: np.ndarray) -> np.ndarray:
@@ -26,15 +39,52 @@ def get_truth_edge_index(pids: np.ndarray) -> np.ndarray:
     pid_df = pid_df[pid_df["particle_id"] != 0]
     # gets all the combinations within each particle_id
     index_combos_within_pid = pid_df.merge(pid_df, on="particle_id")
-    # remove connections to itself and bi-directional edges
-    non_repeating_indices = index_combos_within_pid[
-        index_combos_within_pid["index_x"] != index_combos_within_pid["index_y"]
-    ]
-    non_repeating_indices[["index_x", "index_y"]] = np.sort(
-        non_repeating_indices[["index_x", "index_y"]].values, axis=1
-    )
-    non_repeating_indices = non_repeating_indices.drop_duplicates()
-    return non_repeating_indices[["index_x", "index_y"]].to_numpy().T
+    # remove connections to itself and bi-directional edges: the merge yields
+    # every pair in both orders, so keep only the ordered one
+    index_x = index_combos_within_pid["index_x"].to_numpy()
+    index_y = index_combos_within_pid["index_y"].to_numpy()
+    non_repeating = index_x < index_y
+    return np.stack([index_x[non_repeating], index_y[non_repeating]])
+
+
+#: Number of threads used to write the output files of an event
+_N_WRITE_THREADS = 4
+
+
+def _save_data(data: Data | list[Data], path: Path) -> None:
+    # The legacy (non-zipfile) format is faster to write for many small tensors
+    torch.save(data, path, _use_new_zipfile_serialization=False)
+
+
+@numba.njit(cache=True)
+def _sector_masks(
+    u: np.ndarray,
+    v: np.ndarray,
+    cos: float,
+    sin: float,
+    slope: float,
+    sector_ds: float,
+    sector_di: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Rotate the hits by the sector angle and compute in a single pass whether
+    they are within the sector, within the (two-sided) band of the extended
+    sector, and within the extended sector (band and ``ur > 0``).
+    """
+    n = len(u)
+    in_sector = np.empty(n, dtype=np.bool_)
+    in_band = np.empty(n, dtype=np.bool_)
+    in_ext_sector = np.empty(n, dtype=np.bool_)
+    ext_slope = sector_ds * slope
+    for i in range(n):
+        ur = u[i] * cos - v[i] * sin
+        vr = u[i] * sin + v[i] * cos
+        # implies ur > 0
+        in_sector[i] = (vr > -slope * ur) and (vr < slope * ur)
+        in_band[i] = (vr > -ext_slope * ur - sector_di) and (
+            vr < ext_slope * ur + sector_di
+        )
+        in_ext_sector[i] = in_band[i] and ur > 0
+    return in_sector, in_band, in_ext_sector
 
 
 DEFAULT_FEATURES = (
@@ -90,6 +140,8 @@ class PointCloudBuilder:
         feature_scale: tuple = _DEFAULT_FEATURE_SCALE,
         add_true_edges: bool = False,
         return_data: bool = False,
+        cache_dir: str | PurePath | None = None,
+        single_file_per_event: bool = False,
     ):
         """Build point clouds, that is, read the input data files and convert them
         to pytorch geometric data objects (without any edges yet).
@@ -112,6 +164,17 @@ class PointCloudBuilder:
             feature_names: Names of features to add
             feature_scale: Scale of features
             add_true_edges: Add true edges to the point cloud
+            cache_dir: If set, the hits of every event (after subdetector selection
+                and feature building) are cached in this directory as parquet
+                files, so that re-runs skip parsing the gzipped CSV files.
+                Requires `pyarrow`. The cache is keyed on all settings that
+                affect the features (including the contents of the detector
+                configuration file).
+            single_file_per_event: Write all sectors of an event as a list of data
+                objects to a single file ``data{evtid}.pt`` instead of one file
+                ``data{evtid}_s{sector}.pt`` per sector. This reduces the number
+                of files by a factor of ``n_sectors``. Load these files with
+                ``TrackingDataset(..., sectors_per_file=n_sectors)``.
         """
         self.outdir = Path(outdir)
         self.outdir.mkdir(parents=True, exist_ok=True)
@@ -128,9 +191,14 @@ class PointCloudBuilder:
         self.measurements: list[dict[str, Any]] = []
         self.write_output = write_output
         self.feature_names = list(feature_names)
-        self.feature_scale = list(feature_scale)
+        self.feature_scale = np.array(feature_scale, dtype=np.float64)
         assert len(self.feature_names) == len(self.feature_scale)
+        #: Multiplicative inverse of the feature scale, None if all scales are 1
+        self._inv_feature_scale: np.ndarray | None = None
+        if not np.all(self.feature_scale == 1):
+            self._inv_feature_scale = 1.0 / self.feature_scale
         self.return_data = return_data
+        self.single_file_per_event = single_file_per_event
 
         suffix = "-hits.csv.gz"
         self.prefixes: list[Path] = []
@@ -142,8 +210,11 @@ class PointCloudBuilder:
             if p.name.endswith(suffix):
                 prefix = p.name.replace(suffix, "")
                 evtid = int(prefix[-9:])
-                for s in range(self.n_sectors):
-                    key = f"data{evtid}_s{s}.pt"
+                if self.single_file_per_event:
+                    keys = [f"data{evtid}.pt"]
+                else:
+                    keys = [f"data{evtid}_s{s}.pt" for s in range(self.n_sectors)]
+                for key in keys:
                     self.exists[key] = key in outfiles
                 self.prefixes.append(self.indir / prefix)
 
@@ -152,12 +223,22 @@ class PointCloudBuilder:
         self._collect_data = collect_data
         self.add_true_edges = add_true_edges
         self._detector = ecf.load_detector(Path(detector_config))[1]
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._cache_key = ""
+        if self.cache_dir is not None:
+            if pa is None:
+                msg = "Caching events with `cache_dir` requires `pyarrow`."
+                raise ImportError(msg)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._cache_key = self._get_cache_key(Path(detector_config))
 
     @staticmethod
     def calc_eta(r: np.ndarray, z: np.ndarray) -> np.ndarray:
-        """Compute pseudorapidity (spatial)."""
-        theta = np.arctan2(r, z)
-        return -np.log(np.tan(theta / 2.0))
+        """Compute pseudorapidity (spatial).
+        Uses the identity ``-log(tan(theta/2)) = arcsinh(z/r)``, which needs a
+        single transcendental function evaluation.
+        """
+        return np.arcsinh(z / r)
 
     def restrict_to_subdetectors(
         self, hits: pd.DataFrame, cells: pd.DataFrame
@@ -166,29 +247,27 @@ class PointCloudBuilder:
         pixel_barrel = [(8, 2), (8, 4), (8, 6), (8, 8)]
         pixel_LEC = [(7, 14), (7, 12), (7, 10), (7, 8), (7, 6), (7, 4), (7, 2)]
         pixel_REC = [(9, 2), (9, 4), (9, 6), (9, 8), (9, 10), (9, 12), (9, 14)]
+        # Encode (volume, layer) pairs as a single integer (layer ids are < 100)
+        # so that the relabelling is a plain array lookup
+        key = hits["volume_id"].to_numpy() * 100 + hits["layer_id"].to_numpy()
         if self.pixel_only:
-            available_allowed_layers = sorted(pixel_barrel + pixel_REC + pixel_LEC)
-        else:
-            available_allowed_layers = (
-                hits[["volume_id", "layer_id"]]
-                .value_counts()
-                .reset_index()
-                .sort_values(by=["volume_id", "layer_id"])
+            allowed_keys = np.array(
+                [
+                    volume_id * 100 + layer_id
+                    for volume_id, layer_id in sorted(
+                        pixel_barrel + pixel_REC + pixel_LEC
+                    )
+                ]
             )
-            available_allowed_layers = [
-                tuple(x)
-                for x in available_allowed_layers[["volume_id", "layer_id"]].to_numpy()
-            ]
-
-        new_layer_ids = dict(
-            zip(available_allowed_layers, range(len(available_allowed_layers)))
-        )
-
-        hits["layer"] = pd.Series(list(zip(hits["volume_id"], hits["layer_id"]))).map(
-            new_layer_ids
-        )
+            lut = np.full(max(key.max(), allowed_keys.max()) + 1, -1, dtype=np.int64)
+            lut[allowed_keys] = np.arange(len(allowed_keys))
+            layer = lut[key]
+        else:
+            # All available layers, sorted by (volume, layer)
+            layer = np.unique(key, return_inverse=True)[1].reshape(-1)
 
-        hits = hits.dropna(subset="layer")
+        hits["layer"] = layer
+        hits = hits[layer >= 0]
 
         cells = cells[cells.hit_id.isin(hits.hit_id)].copy()
 
@@ -205,17 +284,19 @@ class PointCloudBuilder:
         particles["pt"] = np.sqrt(particles.px**2 + particles.py**2)
         particles["eta_pt"] = self.calc_eta(particles.pt, particles.pz)
 
-        # handle noise
-        truth_noise = truth[["hit_id", "particle_id"]][truth.particle_id == 0]
-        truth_noise["pt"] = 0
+        # Noise hits (particle_id == 0) have no entry in the particles table,
+        # so a single left merge leaves their pt as NaN. Keep them (with pt = 0)
+        # unless noise is removed.
         truth = truth[["hit_id", "particle_id"]].merge(
-            particles[["particle_id", "pt", "eta_pt", "q", "vx", "vy"]],
+            particles[["particle_id", "pt", "eta_pt"]],
             on="particle_id",
+            how="left",
         )
-
-        # optionally add noise
+        keep = truth["pt"].notna()
         if not self.remove_noise:
-            truth = pd.concat([truth, truth_noise])
+            keep |= truth["particle_id"] == 0
+        truth = truth[keep]
+        truth = truth.assign(pt=truth["pt"].fillna(0))
 
         # add in channel-specific info
         cells_agg = cells.groupby(["hit_id"]).agg(
@@ -232,99 +313,150 @@ class PointCloudBuilder:
         for v in volume_labels:
             hits[v] = (hits.volume_id == int(v[1:])).astype(int)
 
-        hits["r"] = np.sqrt(hits.x**2 + hits.y**2)
-        hits["phi"] = np.arctan2(hits.y, hits.x)
-        hits["eta_rz"] = self.calc_eta(hits.r, hits.z)
-        hits["u"] = hits["x"] / (hits["x"] ** 2 + hits["y"] ** 2)
-        hits["v"] = hits["y"] / (hits["x"] ** 2 + hits["y"] ** 2)
+        # Compute all geometric features on the raw arrays in one go, reusing
+        # x^2 + y^2 for r, u, and v
+        x = hits["x"].to_numpy()
+        y = hits["y"].to_numpy()
+        z = hits["z"].to_numpy()
+        r2 = x * x + y * y
+        inv_r2 = np.reciprocal(r2)
+        r = np.sqrt(r2)
+        hits = hits.assign(
+            r=r,
+            phi=np.arctan2(y, x),
+            eta_rz=self.calc_eta(r, z),
+            u=x * inv_r2,
+            v=y * inv_r2,
+        )
         return hits.merge(truth[["hit_id", "particle_id", "pt", "eta_pt"]], on="hit_id")
 
+    def get_columns(self, hits: pd.DataFrame) -> dict[str, np.ndarray]:
+        """Extract all columns needed for sectorization and for the output data
+        as numpy arrays, so that every sector can be built by indexing them
+        with a mask rather than by slicing the dataframe.
+
+        The arrays are shared between all sectors of the event, so they are
+        converted to the dtypes of the output data (and the features are
+        scaled) only once here. This also adds the per-particle quantities
+        ``n_hits``, ``n_layers_hit``, and ``reconstructable`` for every hit.
+        """
+        cols = {
+            # Keep the exact coordinates for sectorization, so that hits close
+            # to the sector boundaries are assigned consistently
+            "u": hits["u"].to_numpy(dtype=np.float64),
+            "v": hits["v"].to_numpy(dtype=np.float64),
+        }
+        x = hits[self.feature_names].to_numpy(dtype=np.float64)
+        if self._inv_feature_scale is not None:
+            x = x * self._inv_feature_scale
+        cols["x"] = x.astype(np.float32)
+        for name in ("pt", "eta_pt"):
+            cols[name] = hits[name].to_numpy(dtype=np.float32)
+        for name in ("layer", "particle_id"):
+            cols[name] = hits[name].to_numpy(dtype=np.int64)
+        # Compact particle index 0, ..., P-1 for every hit, so that per-particle
+        # quantities can be kept in arrays of length P
+        pid_idx, pids = pd.factorize(cols["particle_id"])
+        cols["pid_idx"] = pid_idx
+        # Groups are sorted by compact index, i.e., aligned with `pids`
+        n_layers_hit = (
+            hits["layer_id"].groupby(pid_idx).nunique().to_numpy(dtype=np.int64)
+        )
+        # is the second condition necessary...
+        reconstructable = (n_layers_hit >= 3) & (pids > 0)
+        cols["n_hits"] = np.bincount(pid_idx)[pid_idx]
+        cols["n_layers_hit"] = n_layers_hit[pid_idx]
+        cols["reconstructable"] = reconstructable[pid_idx].astype(np.int64)
+        return cols
+
     def sector_hits(
-        self, hits: pd.DataFrame, sector_id: int, particle_id_counts: dict[int, int]
-    ) -> pd.DataFrame:
-        """Break an event into (optionally) extended sectors."""
+        self,
+        cols: dict[str, np.ndarray],
+        sector_id: int,
+        particle_id_counts: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Break an event into (optionally) extended sectors.
+
+        Args:
+            cols: Columns of the hits of the event as returned by `get_columns`
+            sector_id: Sector to build
+            particle_id_counts: Total number of hits of each particle, indexed by
+                the compact particle index ``cols["pid_idx"]``
+
+        Returns:
+            Boolean mask selecting the hits of the extended sector and the sector
+            label (``sector_id`` or -1) of each of the selected hits
+        """
+        particle_id = cols["particle_id"]
 
         if self.n_sectors == 1:
-            hits["sector"] = 0
-            return hits
+            return np.ones(len(particle_id), dtype=bool), np.zeros(
+                len(particle_id), dtype=np.int64
+            )
 
         # build sectors in each 2*np.pi/self.n_sectors window
         theta = np.pi / self.n_sectors
         slope = np.arctan(theta)
-        hits["ur"] = hits["u"] * np.cos(2 * sector_id * theta) - hits["v"] * np.sin(
-            2 * sector_id * theta
+        sector_mask, in_band, mask = _sector_masks(
+            cols["u"],
+            cols["v"],
+            np.cos(2 * sector_id * theta),
+            np.sin(2 * sector_id * theta),
+            slope,
+            self.sector_ds,
+            self.sector_di,
         )
-        hits["vr"] = hits["u"] * np.sin(2 * sector_id * theta) + hits["v"] * np.cos(
-            2 * sector_id * theta
-        )
-        sector = hits[
-            ((hits.vr > -slope * hits.ur) & (hits.vr < slope * hits.ur) & (hits.ur > 0))
-        ]
 
         # assign when the majority of the particle's hits are in a sector
-        particle_id_sectors = collections.defaultdict(lambda: -1)
-        for pid in np.unique(sector.particle_id.to_numpy()):
-            if pid == 0:
-                continue
-            hits_in_sector = len(sector[sector.particle_id == pid])
-            hits_for_pid = particle_id_counts[particle_id_counts["particle_id"] == pid]
-            if (hits_in_sector / len(hits_for_pid)) >= 0.5:
-                particle_id_sectors[pid] = sector_id
-
-        lower_bound = -self.sector_ds * slope * hits.ur - self.sector_di
-        upper_bound = self.sector_ds * slope * hits.ur + self.sector_di
-        extended_sector = hits[
-            ((hits.vr > lower_bound) & (hits.vr < upper_bound) & (hits.ur > 0))
-        ]
-
-        extended_sector["sector"] = extended_sector["particle_id"].map(
-            particle_id_sectors
-        )
+        pid_idx = cols["pid_idx"]
+        n_pids = len(particle_id_counts)
+        hits_in_sector = np.bincount(pid_idx[sector_mask], minlength=n_pids)
+        particle_id_sectors = np.full(n_pids, -1, dtype=np.int64)
+        particle_id_sectors[hits_in_sector / particle_id_counts >= 0.5] = sector_id
+
+        ext_pids = particle_id[mask]
+
+        sector = np.where(ext_pids != 0, particle_id_sectors[pid_idx[mask]], -1)
 
         measurements = {}
         if self.measurement_mode:
-            measurements["n_hits"] = len(sector)
-            measurements["n_hits_ext"] = len(extended_sector)
-            if len(sector) > 0:
-                measurements["n_hits_ratio"] = len(extended_sector) / len(sector)
+            n_sector = int(sector_mask.sum())
+            n_ext_sector = len(ext_pids)
+            measurements["n_hits"] = n_sector
+            measurements["n_hits_ext"] = n_ext_sector
+            if n_sector > 0:
+                measurements["n_hits_ratio"] = n_ext_sector / n_sector
             else:
                 measurements["n_hits_ratio"] = 0
 
-            measurements["n_unique_pids"] = len(
-                np.unique(extended_sector.particle_id.to_numpy())
+            ext_pid_counts = np.bincount(pid_idx[mask], minlength=n_pids)
+            measurements["n_unique_pids"] = int(np.count_nonzero(ext_pid_counts))
+
+            # all hits of the (non-noise) particles in the extended sector
+            group_mask = (ext_pid_counts > 0)[pid_idx] & (particle_id != 0)
+            group_pt = cols["pt"][group_mask]
+            in_sector = sector_mask[group_mask] & (group_pt >= self.thld)
+            in_ext_sector = in_band[group_mask] & (group_pt > self.thld)
+            group_pid_idx = pid_idx[group_mask]
+            in_group = np.bincount(group_pid_idx, minlength=n_pids) > 0
+            n_in_sector = np.bincount(
+                group_pid_idx, weights=in_sector, minlength=n_pids
             )
-
-            majority_contained = []
-            for pid in np.unique(extended_sector.particle_id.to_numpy()):
-                if pid == 0:
-                    continue
-                group = hits[hits.particle_id == pid]
-                in_sector = (
-                    (group.vr < slope * group.ur)
-                    & (group.vr > -slope * group.ur)
-                    & (group.pt >= self.thld)
-                )
-                n_total = len(
-                    particle_id_counts[particle_id_counts["particle_id"] == pid]
-                )
-                if sum(in_sector) / n_total < 0.5:
-                    continue
-
-                in_ext_sector = (
-                    (group.vr < (self.sector_ds * slope * group.ur + self.sector_di))
-                    & (group.vr > (-self.sector_ds * slope * group.ur - self.sector_di))
-                    & (group.pt > self.thld)
-                )
-                majority_contained.append(sum(in_ext_sector) == n_total)
+            n_in_ext_sector = np.bincount(
+                group_pid_idx, weights=in_ext_sector, minlength=n_pids
+            )
+            is_majority = in_group & (n_in_sector / particle_id_counts >= 0.5)
+            is_contained = n_in_ext_sector == particle_id_counts
+            majority_contained = is_contained[is_majority]
 
             def zero_div(x, y):
                 return x / y if y != 0 else 0
 
-            efficiency = zero_div(sum(majority_contained), len(majority_contained))
+            efficiency = zero_div(majority_contained.sum(), len(majority_contained))
             measurements["majority_contained"] = efficiency
             self.measurements.append(measurements)
 
-        return extended_sector
+        return mask, sector
 
     def _get_edge_index(self, particle_id: np.ndarray) -> torch.Tensor:
         if self.add_true_edges:
@@ -333,23 +465,33 @@ class PointCloudBuilder:
             edges = torch.zeros((2, 0)).long()
         return edges
 
-    def to_pyg_data(self, hits: pd.DataFrame) -> Data:
-        """Build the output data structure"""
+    def to_pyg_data(
+        self, cols: dict[str, np.ndarray], mask: np.ndarray, sector: np.ndarray
+    ) -> Data:
+        """Build the output data structure
+
+        Args:
+            cols: Columns of the hits of the event as returned by `get_columns`
+            mask: Mask selecting the hits to include
+            sector: Sector label of each of the selected hits
+        """
+
+        def select(name: str) -> torch.Tensor:
+            return torch.from_numpy(cols[name][mask])
+
+        particle_id = cols["particle_id"][mask]
         return Data(
-            x=torch.tensor(
-                hits[self.feature_names].to_numpy() / self.feature_scale,
-                dtype=torch.float32,
-            ),
-            edge_index=self._get_edge_index(hits["particle_id"].values),
+            x=select("x"),
+            edge_index=self._get_edge_index(particle_id),
             y=torch.zeros(0).float(),
-            layer=torch.tensor(hits.layer.values).long(),
-            particle_id=torch.tensor(hits["particle_id"].values).long(),
-            pt=torch.tensor(hits["pt"].values).float(),
-            reconstructable=torch.tensor(hits["reconstructable"].values).long(),
-            sector=torch.tensor(hits["sector"].values).long(),
-            eta=torch.tensor(hits["eta_pt"].values).float(),
-            n_hits=torch.tensor(hits["n_hits"].values).long(),
-            n_layers_hit=torch.tensor(hits["n_layers_hit"].values).long(),
+            layer=select("layer"),
+            particle_id=torch.from_numpy(particle_id),
+            pt=select("pt"),
+            reconstructable=select("reconstructable"),
+            sector=torch.from_numpy(sector).long(),
+            eta=select("eta_pt"),
+            n_hits=select("n_hits"),
+            n_layers_hit=select("n_layers_hit"),
         )
 
     def get_measurements(self) -> dict[str, float]:
@@ -362,11 +504,163 @@ class PointCloudBuilder:
             output[var + "_err"] = stds[var]
         return output
 
+    def _get_cache_key(self, detector_config: Path) -> str:
+        """Hash of all settings that affect the cached hits."""
+        settings = {
+            "version": _HIT_CACHE_VERSION,
+            "detector_config": hashlib.sha256(detector_config.read_bytes()).hexdigest(),
+            "pixel_only": self.pixel_only,
+            "remove_noise": self.remove_noise,
+            "feature_names": self.feature_names,
+            "feature_scale": self.feature_scale.tolist(),
+        }
+        return hashlib.sha256(
+            json.dumps(settings, sort_keys=True).encode()
+        ).hexdigest()[:16]
+
+    def _get_cache_path(self, f: Path) -> Path:
+        assert self.cache_dir is not None
+        return self.cache_dir / f"{f.name}-{self._cache_key}.parquet"
+
+    def _load_hits(self, f: Path) -> pd.DataFrame:
+        """Load an event and build the hit features, going through the parquet
+        cache if enabled.
+        """
+        if self.cache_dir is not None:
+            cache_path = self._get_cache_path(f)
+            if cache_path.is_file():
+                self.logger.debug("Reading cached hits from %s", cache_path)
+                return pd.read_parquet(cache_path, engine="pyarrow")
+        hits, particles, truth, cells = simple_data_loader(f)
+        hits, cells = self.restrict_to_subdetectors(hits, cells)
+        hits = self.append_features(hits, particles, truth, cells)
+        if self.cache_dir is not None:
+            hits.to_parquet(
+                cache_path, engine="pyarrow", compression="zstd", index=False
+            )
+        return hits
+
+    def _process_event(
+        self, f: Path, *, ignore_loading_errors: bool = False
+    ) -> dict[str, Any] | None:
+        """Process a single event. This only touches this object's state
+        temporarily, so that it can be run in worker processes. Returns None if
+        the event could not be loaded.
+        """
+        self.logger.debug("Processing %s", f)
+
+        evtid = int(f.name[-9:])
+
+        try:
+            hits = self._load_hits(f)
+        except Exception:
+            if ignore_loading_errors:
+                self.logger.error("Error loading event %d", evtid)
+                self.logger.error(traceback.format_exc())
+                return None
+            raise
+
+        cols = self.get_columns(hits)
+        # Number of hits per particle; also gives all per-event particle counts
+        # without sorting the particle ids again
+        pid_counts = np.bincount(cols["pid_idx"])
+        n_particles = len(pid_counts)
+        n_hits = len(hits)
+        n_noise = int(np.count_nonzero(cols["particle_id"] == 0))
+        n_sector_hits = 0  # total quantities appearing in sectored graph
+        n_sector_particles = 0
+        collected: list[Data] = []
+        built: list[Data] = []
+        n_measurements = len(self.measurements)
+
+        event_name = f"data{evtid}.pt"
+        sector_ids: range | list[int] = range(self.n_sectors)
+        if self.single_file_per_event and self.exists[event_name] and not self.redo:
+            if self._collect_data:
+                collected.extend(torch.load(self.outdir / event_name))
+            self.logger.debug("skipping %s", event_name)
+            sector_ids = []
+
+        # Writing the files in the background overlaps the serialization and disk
+        # I/O with building the next sectors
+        writes = []
+        event_sectors: list[Data] = []
+        with ThreadPoolExecutor(max_workers=_N_WRITE_THREADS) as writer:
+            for s in sector_ids:
+                name = f"data{evtid}_s{s}.pt"
+                if (
+                    not self.single_file_per_event
+                    and self.exists[name]
+                    and not self.redo
+                ):
+                    if self._collect_data:
+                        collected.append(torch.load(self.outdir / name))
+                    self.logger.debug("skipping %s", name)
+                    continue
+                mask, sector_labels = self.sector_hits(
+                    cols, s, particle_id_counts=pid_counts
+                )
+                n_sector_hits += len(sector_labels)
+                n_sector_particles += np.count_nonzero(
+                    np.bincount(cols["pid_idx"][mask], minlength=n_particles)
+                )
+                sector = self.to_pyg_data(cols, mask, sector_labels)
+                if self.return_data:
+                    built.append(sector)
+                if self._collect_data:
+                    collected.append(sector)
+                if not self.write_output:
+                    continue
+                if self.single_file_per_event:
+                    event_sectors.append(sector)
+                    continue
+                outfile = self.outdir / name
+                writes.append(writer.submit(_save_data, sector, outfile))
+                self.logger.debug("writing %s", outfile)
+            if event_sectors:
+                outfile = self.outdir / event_name
+                writes.append(writer.submit(_save_data, event_sectors, outfile))
+                self.logger.debug("writing %s", outfile)
+        for write in writes:
+            # Re-raise any exceptions from writing
+            write.result()
+
+        # Hand the measurements back to the caller rather than keeping them, so
+        # that serial and parallel processing behave the same
+        measurements = self.measurements[n_measurements:]
+        del self.measurements[n_measurements:]
+        return {
+            "evtid": evtid,
+            "stats": {
+                "n_hits": n_hits,
+                "n_particles": n_particles,
+                "n_noise": n_noise,
+                "n_sector_hits": n_sector_hits,
+                "n_sector_particles": n_sector_particles,
+            },
+            "collected": collected,
+            "built": built,
+            "measurements": measurements,
+        }
+
+    def _get_worker_copy(self) -> "PointCloudBuilder":
+        """Shallow copy of this builder without the results accumulated so far.
+        This is what is sent to the worker processes: It holds all the
+        configuration needed by `_process_event`, whereas ``data_list`` (which
+        keeps growing) would otherwise be pickled for every event.
+        """
+        worker = copy.copy(self)
+        worker.data_list = []
+        worker.stats = {}
+        worker.measurements = []
+        return worker
+
     def process(
         self,
         start: int | None = None,
         stop: int | None = None,
         ignore_loading_errors=False,
+        max_processes: int = 1,
     ):
         """Process input files from self.input_files and write output files to
         self.output_files
@@ -376,80 +670,45 @@ class PointCloudBuilder:
             stop: index of last file to process (or None). Can be higher than total
                 number of files.
             ignore_loading_errors: if True, ignore errors when loading event
+            max_processes: Maximum number of processes to use. Events are
+                independent, so with more than one process, they are distributed
+                over (spawned) worker processes.
         Returns:
 
         """
-
-        for f in self.prefixes[start:stop]:
-            self.logger.debug("Processing %s", f)
-
-            evtid = int(f.name[-9:])
-
-            try:
-                hits, particles, truth, cells = simple_data_loader(f)
-            except Exception:
-                if ignore_loading_errors:
-                    self.logger.error("Error loading event %d", evtid)
-                    self.logger.error(traceback.format_exc())
-                    continue
-                raise
-
-            hits, cells = self.restrict_to_subdetectors(hits, cells)
-            hits = self.append_features(hits, particles, truth, cells)
-
-            pid_layer_count = (
-                hits.groupby("particle_id")
-                .agg(
-                    n_hits=("particle_id", "size"), n_layers_hit=("layer_id", "nunique")
-                )
-                .reset_index()
+        prefixes = self.prefixes[start:stop]
+        if max_processes > 1:
+            task = partial(
+                self._get_worker_copy()._process_event,
+                ignore_loading_errors=ignore_loading_errors,
             )
-            # is the second condition necessary...
-            hits = hits.merge(pid_layer_count, on="particle_id", how="left")
-            hits["reconstructable"] = (hits["n_layers_hit"] >= 3) & (
-                hits["particle_id"] > 0
+            # Spawn rather than fork the workers: forking a process that already
+            # runs thread pools (e.g., torch's or numba's) can deadlock
+            with ProcessPoolExecutor(
+                max_workers=max_processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                results = list(tqdm(executor.map(task, prefixes), total=len(prefixes)))
+        else:
+            task = partial(
+                self._process_event, ignore_loading_errors=ignore_loading_errors
             )
-            n_particles = len(np.unique(hits.particle_id.to_numpy()))
-            n_hits = len(hits)
-            n_noise = len(hits[hits.particle_id == 0])
-            n_sector_hits = 0  # total quantities appearing in sectored graph
-            n_sector_particles = 0
-            sector_list = []
-
-            for s in range(self.n_sectors):
-                name = f"data{evtid}_s{s}.pt"
-                if self.exists[name] and not self.redo:
-                    if self._collect_data:
-                        data = torch.load(self.outdir / name)
-                        self.data_list.append(data)
-                    self.logger.debug("skipping %s", name)
-                    continue
-                sector = self.sector_hits(
-                    hits,
-                    s,
-                    particle_id_counts=pid_layer_count[["particle_id", "n_hits"]],
-                )
-                n_sector_hits += len(sector)
-                n_sector_particles += len(np.unique(sector.particle_id.to_numpy()))
-                sector = self.to_pyg_data(sector)
-                if self.return_data and self.n_sectors > 1:
-                    sector_list.append(sector)
-                outfile = self.outdir / name
-                if self.write_output:
-                    torch.save(sector, outfile)
-                if self._collect_data:
-                    self.data_list.append(sector)
-                self.logger.debug("wrote %s", outfile)
-
-            self.stats[evtid] = {
-                "n_hits": n_hits,
-                "n_particles": n_particles,
-                "n_noise": n_noise,
-                "n_sector_hits": n_sector_hits,
-                "n_sector_particles": n_sector_particles,
-            }
+            results = map(task, prefixes)
 
-        self.logger.debug("Output statistics: %s", self.stats[evtid])
+        built: list[Data] = []
+        evtid = None
+        for result in results:
+            if result is None:
+                continue
+            evtid = result["evtid"]
+            self.stats[evtid] = result["stats"]
+            self.data_list.extend(result["collected"])
+            self.measurements.extend(result["measurements"])
+            if result["built"]:
+                built = result["built"]
+
+        if evtid is not None:
+            self.logger.debug("Output statistics: %s", self.stats[evtid])
         if self.measurement_mode:
             measurements = pd.DataFrame(self.measurements)
             means = measurements.mean()
@@ -459,9 +718,9 @@ class PointCloudBuilder:
                 self.logger.debug(_)
 
         if self.return_data and self.n_sectors > 1:
-            graph_out = sector_list
+            graph_out = built
         elif self.return_data:
-            graph_out = sector
+            graph_out = built[-1]
         else:
             graph_out = None
         return graph_out
@@ -11,6 +11,7 @@ from pytorch_lightning.cli import LRSchedulerCallable, OptimizerCallable
 from torch import Tensor, nn
 from torch_geometric.data import Data
 
+from gnn_tracking.utils.dictionaries import to_floats
 from gnn_tracking.utils.lightning import StandardError, obj_from_or_to_hparams
 from gnn_tracking.utils.log import get_logger
 from gnn_tracking.utils.oom import tolerate_some_oom_errors
@@ -31,7 +32,9 @@ class ImprovedLogLM(LightningModule):
         of the validation metrics to the console after each validation epoch.
         """
         super().__init__(**kwargs)
-        self._uncertainties = collections.defaultdict(StandardError)
+        #: Values of all metrics for which to calculate uncertainties. They are
+        #: only reduced once at the end of the epoch.
+        self._uncertainty_values: dict[str, list[float]] = collections.defaultdict(list)
         self.print_validation_results = True
 
     def log_dict_with_errors(self, dct: dict[str, float], batch_size=None) -> None:
@@ -46,18 +49,20 @@ class ImprovedLogLM(LightningModule):
             on_epoch=True,
             batch_size=batch_size,
         )
-        for k, v in dct.items():
+        for k, v in to_floats(dct).items():
             if f"{k}_std" in dct or k.endswith("_std"):
                 continue
-            self._uncertainties[k](torch.Tensor([v]))
+            self._uncertainty_values[k].append(float(v))
 
     def _log_errors(self) -> None:
         """Log the uncertainties calculated in `log_dict_with_errors`.
         Needs to be called at the end of the train/val/test epoch.
         """
-        for k, v in self._uncertainties.items():
-            self.log(k + "_std", v.compute(), on_epoch=True, batch_size=1)
-        self._uncertainties.clear()
+        for k, values in self._uncertainty_values.items():
+            se = StandardError()
+            se.update(torch.tensor(values))
+            self.log(k + "_std", se.compute(), on_epoch=True, batch_size=1)
+        self._uncertainty_values.clear()
 
     # noinspection PyUnusedLocal
     def on_train_epoch_end(self, *args) -> None:
@@ -78,14 +83,31 @@ class TrackingModule(ImprovedLogLM):
         optimizer: OptimizerCallable = torch.optim.Adam,
         scheduler: LRSchedulerCallable = torch.optim.lr_scheduler.ConstantLR,
         preproc: nn.Module | None = None,
+        compile_model: bool = False,
     ):
-        """Base class for all pytorch lightning modules in this project."""
+        """Base class for all pytorch lightning modules in this project.
+
+        Args:
+            model: The model
+            optimizer: Optimizer
+            scheduler: Learning rate scheduler
+            preproc: Preprocessing module that is applied to the data before it
+                is passed to the model
+            compile_model: Compile the model with `torch.compile`. Shapes are
+                treated as dynamic, because every batch has different numbers of
+                nodes and edges.
+        """
         super().__init__()
         self.model = obj_from_or_to_hparams(self, "model", model)
+        if compile_model:
+            # Compiles in place, so that the keys of the state dict don't change
+            self.model.compile(dynamic=True)
         self.logg = get_logger("TM", level=logging.DEBUG)
         self.preproc = obj_from_or_to_hparams(self, "preproc", preproc)
         self.optimizer = optimizer
         self.scheduler = scheduler
+        #: CUDA stream for host to device copies of the batches
+        self._copy_stream: torch.cuda.Stream | None = None
 
         warnings.filterwarnings(
             "ignore",
@@ -103,6 +125,26 @@ class TrackingModule(ImprovedLogLM):
             return self.preproc(data)
         return data
 
+    def transfer_batch_to_device(
+        self, batch: Any, device: torch.device, dataloader_idx: int
+    ) -> Any:
+        if isinstance(batch, Data) and device.type == "cuda":
+            # Lightning only uses non-blocking copies for plain tensors. Our
+            # loaders use pinned memory, so the copy can overlap with compute.
+            # Copying on a separate stream lets it run while the default stream
+            # is still busy with the previous batch.
+            if self._copy_stream is None:
+                self._copy_stream = torch.cuda.Stream(device)
+            compute_stream = torch.cuda.current_stream(device)
+            with torch.cuda.stream(self._copy_stream):
+                batch = batch.to(device, non_blocking=True)
+            compute_stream.wait_stream(self._copy_stream)
+            # The memory was allocated on the copy stream but is used on the
+            # compute stream, so the caching allocator must not reuse it early
+            batch.apply_(lambda t: t.record_stream(compute_stream))
+            return batch
+        return super().transfer_batch_to_device(batch, device, dataloader_idx)
+
     def configure_optimizers(self) -> Any:
         optimizer = self.optimizer(self.parameters())
         scheduler = self.scheduler(optimizer)
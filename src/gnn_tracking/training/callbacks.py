@@ -61,11 +61,19 @@ class PrintValidationMetrics(Callback):
     metrics for which this function returns True are printed.
     If the lightning module has a `highlight_metric` attribute, the metric
     returned by this function is highlighted in the output.
+    If the lightning module has a falsy `print_validation_results` attribute,
+    nothing is printed.
     """
 
     def on_validation_end(self, trainer: Trainer, pl_module: LightningModule) -> None:
         if trainer.sanity_checking:
             return
+        # Only rank zero prints (see `LightningModule.print`), so don't format the
+        # table on the other ranks
+        if not trainer.is_global_zero:
+            return
+        if not getattr(pl_module, "print_validation_results", True):
+            return
         metrics = trainer.callback_metrics
         if not metrics:
             return
@@ -3,8 +3,10 @@
 # Ignore unused arguments because of save_hyperparameters
 # ruff: noqa: ARG002
 
+import collections
 from typing import Any
 
+import torch
 from torch import Tensor, nn
 from torch import Tensor as T
 from torch_geometric.data import Data
@@ -18,6 +20,9 @@ from gnn_tracking.utils.lightning import obj_from_or_to_hparams
 from gnn_tracking.utils.nomenclature import denote_pt
 from gnn_tracking.utils.oom import tolerate_some_oom_errors
 
+#: pt thresholds for the validation metrics
+_PT_THLDS = (0.0, 0.5, 0.9, 1.5)
+
 
 class ECModule(TrackingModule):
     def __init__(
@@ -29,6 +34,10 @@ class ECModule(TrackingModule):
         """Lightning module for edge classifier training."""
         super().__init__(**kwargs)
         self.loss_fct = obj_from_or_to_hparams(self, "loss_fct", loss_fct)
+        #: Edge classifier outputs, truth labels and edge pts (larger pt of the
+        #: two hits) of all batches of the current validation epoch. Kept on the
+        #: CPU, so that a full validation epoch does not have to fit on the GPU
+        self._val_edge_outputs: dict[str, list[T]] = collections.defaultdict(list)
 
     def get_losses(self, out: dict[str, Any], data: Data) -> T:
         return self.loss_fct(
@@ -62,26 +71,62 @@ class ECModule(TrackingModule):
             on_epoch=True,
             batch_size=self.trainer.val_dataloaders.batch_size,
         )
-        metrics = {}
-        for pt in [0.0, 0.5, 0.9, 1.5]:
-            if pt > 0:
-                pt_mask = (batch.pt[batch.edge_index[0]] > pt) | (
-                    batch.pt[batch.edge_index[1]] > pt
-                )
-                w = out["W"][pt_mask]
-                y = batch.y[pt_mask]
-            else:
-                w = out["W"]
-                y = batch.y
-            _metrics = get_roc_auc_scores(
-                true=y, predicted=w, max_fprs=[None, 0.01, 0.001]
-            ) | get_maximized_bcs(y=y, output=w)
-            metrics |= denote_pt(_metrics, pt)
-        # todo: add graph analysis
-        self.log_dict_with_errors(
-            metrics,
-            batch_size=self.trainer.val_dataloaders.batch_size,
+        edge_pt = torch.maximum(
+            batch.pt[batch.edge_index[0]], batch.pt[batch.edge_index[1]]
         )
+        self._val_edge_outputs["w"].append(out["W"].detach().cpu())
+        self._val_edge_outputs["y"].append(batch.y.detach().cpu())
+        self._val_edge_outputs["pt"].append(edge_pt.cpu())
+        # todo: add graph analysis
+
+    def _gather_edge_outputs(self, x: T) -> T:
+        """Concatenate the validation edge outputs of all ranks.
+
+        Ranks can hold different numbers of edges, so the tensors are padded to
+        the largest length before gathering and the padding is removed again.
+
+        Args:
+            x: Edge outputs of this rank (on the CPU)
+
+        Returns:
+            Edge outputs of all ranks (on the CPU)
+        """
+        if self.trainer.world_size == 1:
+            return x
+        n_edges = self.all_gather(torch.tensor(len(x), device=self.device))
+        padded = x.new_zeros((int(n_edges.max()), *x.shape[1:]))
+        padded[: len(x)] = x
+        gathered = self.all_gather(padded.to(self.device)).cpu()
+        return torch.cat([g[:n] for g, n in zip(gathered, n_edges.tolist())])
+
+    def on_validation_epoch_end(self) -> None:
+        # ROC AUC and the threshold scan are evaluated once on the predictions of
+        # the whole epoch rather than averaged over batches, which avoids
+        # sweeping every batch separately. Because there is only one value per
+        # epoch, these metrics have no batch-to-batch uncertainty (no ``*_std``
+        # metrics are logged for them). With several ranks, the predictions
+        # of all ranks are gathered first, so every rank logs the same values.
+        if self._val_edge_outputs:
+            metrics = {}
+            all_w, all_y, edge_pt = (
+                self._gather_edge_outputs(torch.cat(self._val_edge_outputs[k]))
+                for k in ("w", "y", "pt")
+            )
+            self._val_edge_outputs.clear()
+            for pt in _PT_THLDS:
+                if pt > 0:
+                    pt_mask = edge_pt > pt
+                    w = all_w[pt_mask]
+                    y = all_y[pt_mask]
+                else:
+                    w = all_w
+                    y = all_y
+                _metrics = get_roc_auc_scores(
+                    true=y, predicted=w, max_fprs=[None, 0.01, 0.001], device="cpu"
+                ) | get_maximized_bcs(y=y, output=w)
+                metrics |= denote_pt(_metrics, pt)
+            self.log_dict(metrics, on_epoch=True, batch_size=1)
+        super().on_validation_epoch_end()
 
     def highlight_metric(self, metric: str) -> bool:
         return metric in ["max_mcc_pt0.9", "total", "tpr_eq_tnr_pt0.9"]
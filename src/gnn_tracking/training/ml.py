@@ -55,12 +55,13 @@ class MLModule(TrackingModule):
             eta=data.eta,
             reconstructable=data.reconstructable,
         )
-        metrics = (
+        # Convert everything at once to avoid one device sync per metric
+        metrics = to_floats(
             losses.loss_dct
-            | to_floats(add_key_suffix(losses.weighted_losses, "_weighted"))
-            | to_floats(losses.extra_metrics)
+            | add_key_suffix(losses.weighted_losses, "_weighted")
+            | losses.extra_metrics
+            | {"total": losses.loss}
         )
-        metrics["total"] = float(losses.loss)
         return losses.loss, metrics
 
     @tolerate_some_oom_errors
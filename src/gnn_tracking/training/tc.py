@@ -42,10 +42,16 @@ class TCModule(TrackingModule):
         )
         self._cluster_scan_input = collections.defaultdict(list)
         self._best_cluster_params = {}
+        #: Number of batches of the current validation run
+        self._n_val_batches = 0
+
+    def on_validation_epoch_start(self) -> None:
+        # Looked up once per validation run rather than for every batch
+        self._n_val_batches = self.trainer.num_val_batches[0]
 
     def is_last_val_batch(self, batch_idx: int) -> bool:
         """Are we validating the last batch of the validation set?"""
-        return batch_idx == self.trainer.num_val_batches[0] - 1
+        return batch_idx == self._n_val_batches - 1
 
     def get_losses(
         self, out: dict[str, Any], data: Data
@@ -61,12 +67,13 @@ class TCModule(TrackingModule):
             batch=data.batch,
             true_edge_index=getattr(data, "true_edges", None),
         )
-        metrics = (
+        # Convert everything at once to avoid one device sync per metric
+        metrics = to_floats(
             losses.loss_dct
-            | to_floats(add_key_suffix(losses.weighted_losses, "_weighted"))
-            | to_floats(losses.extra_metrics)
+            | add_key_suffix(losses.weighted_losses, "_weighted")
+            | losses.extra_metrics
+            | {"total": losses.loss}
         )
-        metrics["total"] = float(losses.loss)
         return losses.loss, metrics
 
     @tolerate_some_oom_errors
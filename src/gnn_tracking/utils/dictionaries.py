@@ -1,7 +1,8 @@
 import inspect
 import itertools
+from collections import defaultdict
 from copy import deepcopy
-from typing import Any, Optional, Sequence, TypeVar
+from typing import Any, Iterator, Optional, Sequence, TypeVar
 
 import torch
 
@@ -49,19 +50,48 @@ def pivot_record_list(records: list[dict]) -> dict:
     return {k: [r[k] for r in records] for k in keys}
 
 
-def to_floats(inpt: Any) -> Any:
-    """Convert all tensors in a datastructure to floats.
-    Works on single tensors, lists, or dictionaries, nested or not.
-    """
+def _collect_tensors(inpt: Any, tensors: list[torch.Tensor]) -> None:
+    if isinstance(inpt, dict):
+        for v in inpt.values():
+            _collect_tensors(v, tensors)
+    elif isinstance(inpt, list):
+        for v in inpt:
+            _collect_tensors(v, tensors)
+    elif isinstance(inpt, torch.Tensor):
+        tensors.append(inpt)
+
+
+def _replace_tensors(inpt: Any, values: Iterator[float]) -> Any:
     if isinstance(inpt, dict):
-        return {k: to_floats(v) for k, v in inpt.items()}
+        return {k: _replace_tensors(v, values) for k, v in inpt.items()}
     if isinstance(inpt, list):
-        return [to_floats(v) for v in inpt]
+        return [_replace_tensors(v, values) for v in inpt]
     if isinstance(inpt, torch.Tensor):
-        return float(inpt)
+        return next(values)
     return inpt
 
 
+def to_floats(inpt: Any) -> Any:
+    """Convert all tensors in a datastructure to floats.
+    Works on single tensors, lists, or dictionaries, nested or not.
+
+    All tensors on the same device (and with the same dtype) are copied to the
+    CPU together, so that there is only one synchronization per device rather
+    than one per tensor.
+    """
+    tensors: list[torch.Tensor] = []
+    _collect_tensors(inpt, tensors)
+    groups: dict[tuple[torch.device, torch.dtype], list[int]] = defaultdict(list)
+    for i, t in enumerate(tensors):
+        groups[(t.device, t.dtype)].append(i)
+    floats = [0.0] * len(tensors)
+    for idxs in groups.values():
+        stacked = torch.stack([tensors[i].detach().reshape(()) for i in idxs])
+        for i, v in zip(idxs, stacked.tolist()):
+            floats[i] = float(v)
+    return _replace_tensors(inpt, iter(floats))
+
+
 def separate_init_kwargs(kwargs: dict, cls: type) -> tuple[dict, dict]:
     cls_argnames = inspect.signature(cls).parameters.keys()
     cls_kwargs = {k: v for k, v in kwargs.items() if k in cls_argnames}
@@ -1,5 +1,4 @@
 import importlib
-import math
 import os
 from pathlib import Path
 from typing import Any, Literal
@@ -162,13 +161,23 @@ class StandardError(Metric):
         reduce functions.
         """
         super().__init__()
-        self.add_state("values", default=torch.tensor([]), dist_reduce_fx="cat")
+        # Running sums rather than the full list of values, so that every update is
+        # O(1) instead of re-concatenating all previous values
+        _zero = torch.tensor(0.0, dtype=torch.float64)
+        self.add_state("n", default=_zero.clone(), dist_reduce_fx="sum")
+        self.add_state("sum", default=_zero.clone(), dist_reduce_fx="sum")
+        self.add_state("sum_sq", default=_zero.clone(), dist_reduce_fx="sum")
 
     def update(self, x: Tensor):
-        self.values = torch.cat((self.values, x))
+        x = x.detach().to(torch.float64)
+        self.n += x.numel()
+        self.sum += x.sum()
+        self.sum_sq += (x**2).sum()
 
     def compute(self):
-        return torch.std(self.values) / math.sqrt(len(self.values))
+        # Unbiased estimate of the variance, same as `torch.std`
+        var = (self.sum_sq - self.sum**2 / self.n) / (self.n - 1)
+        return (var.clamp(min=0).sqrt() / self.n.sqrt()).float()
 
 
 class SimpleTqdmProgressBar(pytorch_lightning.callbacks.ProgressBar):
@@ -197,8 +206,9 @@ class SimpleTqdmProgressBar(pytorch_lightning.callbacks.ProgressBar):
     def on_train_batch_end(
         self, trainer, pl_module, outputs, batch, batch_idx  # noqa: ARG002
     ):
-        if self.bar:
-            self.bar.update(1)
+        # Only collect the metrics when tqdm actually redraws the bar (this is
+        # throttled by tqdm's mininterval) rather than after every batch
+        if self.bar and self.bar.update(1):
             self.bar.set_postfix(self.get_metrics(trainer, pl_module))
 
     def on_validation_epoch_end(self, trainer, pl_module) -> None:
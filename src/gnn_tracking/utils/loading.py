@@ -23,6 +23,7 @@ class TrackingDataset(Dataset):
         stop=None,
         sector: int | None = None,
         point_cloud_builder: PointCloudBuilder | None,
+        sectors_per_file: int = 1,
     ):
         """Dataset for tracking applications
 
@@ -32,9 +33,14 @@ class TrackingDataset(Dataset):
                 in dirs considered in order)
             stop: Index of the last file to be considered
             sector: If not None, only files with this sector number will be considered
+            sectors_per_file: Number of sectors in each file. If larger than 1, every
+                file holds a list of all sectors of an event (as written by
+                `PointCloudBuilder` with ``single_file_per_event``).
         """
         super().__init__()
         self.point_cloud_builder = point_cloud_builder
+        self.sectors_per_file = sectors_per_file
+        self._sector = sector
 
         self._processed_paths = self._get_paths(
             in_dir, start=start, stop=stop, sector=sector
@@ -57,8 +63,10 @@ class TrackingDataset(Dataset):
         if self.point_cloud_builder is not None:
             in_dir = Path(self.point_cloud_builder.indir)
             glob = "*-hits.csv.gz"  # avoid overcounting
+        elif sector is None or self.sectors_per_file > 1:
+            glob = "*.pt"
         else:
-            glob = "*.pt" if sector is None else f"*_s{sector}.pt"
+            glob = f"*_s{sector}.pt"
 
         if not isinstance(in_dir, list):
             in_dir = [in_dir]
@@ -89,7 +97,11 @@ class TrackingDataset(Dataset):
         return considered_files
 
     def len(self) -> int:
-        if self.point_cloud_builder is None or self.point_cloud_builder.n_sectors == 1:
+        if self.point_cloud_builder is None:
+            if self._sector is None:
+                return len(self._processed_paths) * self.sectors_per_file
+            return len(self._processed_paths)
+        if self.point_cloud_builder.n_sectors == 1:
             return len(self._processed_paths)
 
         return len(self._processed_paths) * self.point_cloud_builder.n_sectors
@@ -97,7 +109,17 @@ class TrackingDataset(Dataset):
     def get(self, idx: int) -> Data:
         # slightly funky logic to load each sector on the fly without re-processing each file
         if self.point_cloud_builder is None:
-            return torch.load(self._processed_paths[idx])
+            if self.sectors_per_file == 1:
+                return torch.load(self._processed_paths[idx])
+            if self._sector is not None:
+                return torch.load(self._processed_paths[idx])[self._sector]
+            self.file_number = idx // self.sectors_per_file
+            if self.file_number != self.prev_file_number:
+                self.sector_results = torch.load(
+                    self._processed_paths[self.file_number]
+                )
+            self.prev_file_number = self.file_number
+            return self.sector_results[idx - self.file_number * self.sectors_per_file]
 
         if self.point_cloud_builder.n_sectors == 1:
             return self.point_cloud_builder.process(idx, idx + 1)
@@ -142,7 +164,9 @@ class TrackingDataModule(LightningDataModule):
         - `start=0`: Index of first file to load
         - `stop=None`: Index of last file to load
         - `sector=None`: Sector to load from (if None, load all sectors)
+        - `sectors_per_file=1`: Number of sectors in each file
         - `batch_size=1`: Batch size
+        - `prefetch_factor=2`: Number of batches loaded in advance by each worker
 
         Training has the following additional keys:
 
@@ -176,7 +200,15 @@ class TrackingDataModule(LightningDataModule):
         """
         if dct is None:
             return {}
-        for key in ["start", "stop", "sector", "batch_size", "sample_size"]:
+        for key in [
+            "start",
+            "stop",
+            "sector",
+            "sectors_per_file",
+            "batch_size",
+            "sample_size",
+            "prefetch_factor",
+        ]:
             if key in dct:
                 dct[key] = int(dct[key])
         return dct
@@ -202,6 +234,7 @@ class TrackingDataModule(LightningDataModule):
             stop=config.get("stop", None),
             sector=config.get("sector", None),
             point_cloud_builder=point_cloud_builder,  # Pass builder
+            sectors_per_file=config.get("sectors_per_file", 1),
         )
 
     def setup(self, stage: str) -> None:
@@ -234,8 +267,13 @@ class TrackingDataModule(LightningDataModule):
             dataset,
             batch_size=self._configs[key].get("batch_size", 1),
             num_workers=max(1, min(n_samples, self._cpus)),
+            # Keep the workers alive between epochs rather than paying their
+            # startup cost (and that of the dataset) every epoch
+            persistent_workers=True,
+            prefetch_factor=self._configs[key].get("prefetch_factor", 2),
             sampler=sampler,
-            pin_memory=True,
+            # Pinning only helps (and is only supported) for copies to the GPU
+            pin_memory=torch.cuda.is_available(),
         )
 
     def train_dataloader(self):
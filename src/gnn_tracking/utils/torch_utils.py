@@ -1,5 +1,8 @@
 """Utility functions for general torch stuff."""
 
+import numpy as np
+import torch
+from torch import Tensor as T
 from torch import nn
 
 
@@ -27,3 +30,30 @@ def freeze_if(model: nn.Module | None, do_freeze: bool = False) -> nn.Module | N
     if do_freeze:
         return freeze(model)
     return model
+
+
+@torch.jit.script
+def clipped_sigmoid(x: T, epsilon: float) -> T:
+    """Sigmoid that is softly clipped to ``[epsilon, 1 - epsilon]``.
+    Scripted so that the sigmoid and the affine rescaling are fused into a single
+    elementwise kernel.
+    """
+    return epsilon + (1 - 2 * epsilon) * torch.sigmoid(x)
+
+
+def to_numpy(*tensors: T) -> list[np.ndarray]:
+    """Detach tensors and convert them to numpy arrays.
+
+    Tensors on the GPU are copied asynchronously into pinned host memory, so that
+    there is only one synchronization per device rather than one per tensor.
+    """
+    host = []
+    for tensor in tensors:
+        detached = tensor.detach()
+        if detached.is_cuda:
+            buffer = torch.empty(detached.shape, dtype=detached.dtype, pin_memory=True)
+            detached = buffer.copy_(detached, non_blocking=True)
+        host.append(detached)
+    for device in {t.device for t in tensors if t.is_cuda}:
+        torch.cuda.synchronize(device)
+    return [t.numpy() for t in host]
@@ -0,0 +1,15 @@
+import torch
+
+from gnn_tracking.utils.dictionaries import to_floats
+
+
+def test_to_floats():
+    inpt = {
+        "a": torch.tensor(1.5),
+        "b": [torch.tensor([2], dtype=torch.int64), 3, {"c": torch.tensor(True)}],
+        "d": "text",
+    }
+    result = to_floats(inpt)
+    assert result == {"a": 1.5, "b": [2.0, 3, {"c": 1.0}], "d": "text"}
+    assert isinstance(result["b"][0], float)
+    assert to_floats(torch.tensor(0.25)) == 0.25
@@ -1,8 +1,14 @@
+from types import SimpleNamespace
+
+import torch
+
 from gnn_tracking.analysis.edge_classification import (
     ThresholdTrackInfoPlot,
     collect_all_ec_stats,
 )
+from gnn_tracking.metrics.losses.ec import EdgeWeightBCELoss
 from gnn_tracking.models.edge_classifier import ECForGraphTCN
+from gnn_tracking.training.ec import ECModule
 
 
 def test_ec_plot_integration(built_graphs):
@@ -18,3 +24,25 @@ def test_ec_plot_integration(built_graphs):
     )
     df = collect_all_ec_stats(ec, [g], thresholds=[0, 0.5, 1.0])  # type: ignore
     ThresholdTrackInfoPlot(df).plot()
+
+
+def test_gather_edge_outputs_uneven_ranks(monkeypatch):
+    lmodel = ECModule(
+        model=ECForGraphTCN(node_indim=2, edge_indim=2, hidden_dim=2, L_ec=1),
+        loss_fct=EdgeWeightBCELoss(),
+    )
+    this_rank = torch.tensor([1.0, 2.0])
+    other_rank = torch.tensor([3.0, 4.0, 5.0])
+
+    def all_gather(x):
+        # Emulate a second rank that holds more edges than this one
+        if x.ndim == 0:
+            return torch.stack([x, torch.tensor(len(other_rank))])
+        return torch.stack([x, other_rank[: len(x)]])
+
+    monkeypatch.setattr(
+        ECModule, "trainer", property(lambda _: SimpleNamespace(world_size=2))
+    )
+    monkeypatch.setattr(lmodel, "all_gather", all_gather)
+    gathered = lmodel._gather_edge_outputs(this_rank)
+    assert gathered.tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
@@ -0,0 +1,75 @@
+import pytest
+import torch
+from torch_geometric.nn import MessagePassing
+from torch_geometric.utils import scatter
+
+from gnn_tracking.models.interaction_network import (
+    InteractionNetwork,
+    csr_sum_aggregate,
+)
+
+
+def test_csr_sum_aggregate():
+    inputs = torch.rand(20, 3)
+    index = torch.randint(7, size=(20,))
+    # Last node never receives a message
+    expected = scatter(inputs, index, dim=0, dim_size=8, reduce="sum")
+    assert torch.allclose(csr_sum_aggregate(inputs, index, 8), expected)
+
+
+def test_csr_sum_aggregate_gradient():
+    inputs = torch.rand(20, 3, requires_grad=True)
+    index = torch.randint(7, size=(20,))
+    weights = torch.rand(8, 3)
+    (csr_sum_aggregate(inputs, index, 8) * weights).sum().backward()
+    csr_grad = inputs.grad.clone()
+    inputs.grad = None
+    (scatter(inputs, index, dim=0, dim_size=8, reduce="sum") * weights).sum().backward()
+    assert torch.allclose(csr_grad, inputs.grad)
+
+
+def _get_in_outputs(model: InteractionNetwork, x, edge_index, edge_attr):
+    """Outputs and parameter gradients of a forward and backward pass"""
+    model.zero_grad()
+    x_out, e_out = model(x, edge_index, edge_attr)
+    (x_out.float().sum() + e_out.float().sum()).backward()
+    return x_out, e_out, [p.grad.clone() for p in model.parameters()]
+
+
+def _get_in_outputs_scatter(monkeypatch, *args):
+    """Same as `_get_in_outputs`, but with PyG's default (scatter) aggregation"""
+    with monkeypatch.context() as m:
+        m.setattr(InteractionNetwork, "aggregate", MessagePassing.aggregate)
+        return _get_in_outputs(*args)
+
+
+@pytest.mark.parametrize("flow", ["source_to_target", "target_to_source"])
+def test_interaction_network_csr_matches_scatter(monkeypatch, flow):
+    torch.manual_seed(0)
+    model = InteractionNetwork(node_indim=3, edge_indim=2)
+    model.flow = flow
+    x = torch.rand(10, 3)
+    edge_index = torch.randint(10, size=(2, 30))
+    edge_attr = torch.rand(30, 2)
+    csr = _get_in_outputs(model, x, edge_index, edge_attr)
+    ref = _get_in_outputs_scatter(monkeypatch, model, x, edge_index, edge_attr)
+    for a, b in zip(csr[:2], ref[:2]):
+        assert torch.allclose(a, b, atol=1e-6)
+    for a, b in zip(csr[2], ref[2]):
+        assert torch.allclose(a, b, atol=1e-5)
+
+
+def test_interaction_network_autocast(monkeypatch):
+    torch.manual_seed(0)
+    model = InteractionNetwork(node_indim=3, edge_indim=2)
+    x = torch.rand(10, 3)
+    edge_index = torch.randint(10, size=(2, 30))
+    edge_attr = torch.rand(30, 2)
+    with torch.autocast("cpu", dtype=torch.bfloat16):
+        csr = _get_in_outputs(model, x, edge_index, edge_attr)
+        ref = _get_in_outputs_scatter(monkeypatch, model, x, edge_index, edge_attr)
+    assert csr[0].dtype == torch.bfloat16
+    for a, b in zip(csr[:2], ref[:2]):
+        assert torch.allclose(a.float(), b.float())
+    for a, b in zip(csr[2], ref[2]):
+        assert torch.allclose(a, b)
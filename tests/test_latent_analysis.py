@@ -3,7 +3,7 @@ import pytest
 import torch
 from matplotlib import pyplot as plt
 
-from gnn_tracking.analysis.latent import SelectedPidsPlot
+from gnn_tracking.analysis.latent import SelectedPidsPlot, get_color_mapper
 
 
 @pytest.fixture()
@@ -26,3 +26,77 @@ def test_draw_selected_pids(selected_pids_test_data):
     spp.plot_other_hit_ep(axs[1])
     spp.plot_selected_pid_ep(axs[1])
     spp.plot_collateral_ep(axs[1])
+
+
+@pytest.mark.parametrize(
+    "colors", [["red", "green", "blue"], [(1.0, 0.0, 0.0), (0.0, 1.0, 0.0), "blue"]]
+)
+def test_color_mapper(colors):
+    mapper = get_color_mapper(torch.tensor([7, 3, 5]), colors=colors)
+    mapped = mapper(torch.tensor([3, 7, 4, 5, 3]))
+    assert mapped.shape == (5,)
+    assert list(mapped) == [colors[1], colors[0], None, colors[2], colors[1]]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_collateral_hits(seed):
+    rng = torch.Generator().manual_seed(seed)
+    n_hits = 200
+    spp = SelectedPidsPlot(
+        condensation_space=torch.rand(size=(n_hits, 2), generator=rng),
+        input_node_features=torch.rand(size=(n_hits, 5), generator=rng),
+        particle_id=torch.randint(20, size=(n_hits,), generator=rng),
+        labels=torch.randint(30, size=(n_hits,), generator=rng),
+        selected_pids=torch.tensor([0, 3, 7, 11, 25]),
+        ec_hit_mask=torch.ones(n_hits).bool(),
+    )
+    hit_idx, pid = spp.get_collateral_hits()
+    expected = {
+        (i, p)
+        for p in [0, 3, 7, 11, 25]
+        for i in spp.get_collateral_mask(p).nonzero().squeeze(1).tolist()
+    }
+    pairs = list(zip(hit_idx.tolist(), pid.tolist()))
+    assert len(pairs) == len(set(pairs))
+    assert set(pairs) == expected
+
+
+def test_selected_pids_ec_hit_mask():
+    rng = torch.Generator().manual_seed(0)
+    n_hits = 100
+    ec_hit_mask = torch.rand(n_hits, generator=rng) > 0.4
+    n_kept = int(ec_hit_mask.sum())
+    particle_id = torch.randint(8, size=(n_hits,), generator=rng)
+    input_node_features = torch.rand(size=(n_hits, 5), generator=rng)
+    labels = torch.randint(10, size=(n_kept,), generator=rng)
+    spp = SelectedPidsPlot(
+        condensation_space=torch.rand(size=(n_kept, 2), generator=rng),
+        particle_id=particle_id,
+        labels=labels,
+        selected_pids=torch.tensor([1, 2]),
+        ec_hit_mask=ec_hit_mask,
+        input_node_features=input_node_features,
+    )
+    fig, axs = plt.subplots(ncols=2, figsize=(10, 5))
+    spp.plot_other_hit_latent(axs[0])
+    spp.plot_selected_pid_latent(axs[0])
+    spp.plot_collateral_latent(axs[0])
+    spp.plot_other_hit_ep(axs[1])
+    spp.plot_selected_pid_ep(axs[1])
+    spp.plot_collateral_ep(axs[1])
+    kept_pids = particle_id[ec_hit_mask]
+    collateral = spp.get_collateral_mask(1)
+    assert len(collateral) == n_kept
+    expected = torch.isin(labels, labels[kept_pids == 1]) & (kept_pids != 1)
+    assert torch.equal(collateral, expected)
+
+    # Labels for all hits are rejected rather than guessed from their length
+    with pytest.raises(ValueError, match="condensation space"):
+        SelectedPidsPlot(
+            condensation_space=torch.rand(size=(n_kept, 2), generator=rng),
+            particle_id=particle_id,
+            labels=torch.randint(10, size=(n_hits,), generator=rng),
+            selected_pids=torch.tensor([1, 2]),
+            ec_hit_mask=ec_hit_mask,
+            input_node_features=input_node_features,
+        )
@@ -0,0 +1,14 @@
+import math
+
+import torch
+
+from gnn_tracking.utils.lightning import StandardError
+
+
+def test_standard_error():
+    values = torch.rand(20)
+    se = StandardError()
+    for v in values:
+        se(torch.Tensor([v]))
+    expected = torch.std(values) / math.sqrt(len(values))
+    assert torch.isclose(se.compute(), expected)
@@ -2,15 +2,18 @@ import shutil
 from pathlib import Path
 
 import numpy as np
+import pandas as pd
 import pytest
 import torch
 from torch_geometric.data import Batch
 
+from gnn_tracking.preprocessing import point_cloud_builder as pcb
 from gnn_tracking.preprocessing.point_cloud_builder import (
     PointCloudBuilder,
     get_truth_edge_index,
     simple_data_loader,
 )
+from gnn_tracking.utils.loading import TrackingDataset
 
 from .test_data import trackml_test_data_dir
 
@@ -95,6 +98,14 @@ def test_append_features(point_cloud_builder, test_data_files):
         ), f"{feature} is out of range"
 
 
+def test_calc_eta():
+    rng = np.random.default_rng()
+    r = rng.uniform(1, 1000, size=100)
+    z = rng.uniform(-3000, 3000, size=100)
+    expected = -np.log(np.tan(np.arctan2(r, z) / 2.0))
+    assert np.allclose(PointCloudBuilder.calc_eta(r, z), expected)
+
+
 def test_restrict_to_subdetectors_full_det(point_cloud_builder, test_data_files):
     hits, particles, truth, cells = test_data_files
     hits_new_layers, cells = point_cloud_builder.restrict_to_subdetectors(hits, cells)
@@ -205,3 +216,172 @@ def test_process_sectors(point_cloud_builder, test_data_files):
         f"The number of edges falls outside the expected range "
         f" expected {expected_number_of_edges}, got {graph_data.edge_index.shape[1]}"
     )
+
+
+def _get_sector_builder(outdir: Path, **kwargs) -> PointCloudBuilder:
+    config = {
+        "outdir": outdir,
+        "indir": trackml_test_data_dir,
+        "detector_config": trackml_test_data_dir / "detectors.csv.gz",
+        "n_sectors": 4,
+        "redo": True,
+        "pixel_only": True,
+        "write_output": False,
+        "collect_data": True,
+    }
+    return PointCloudBuilder(**(config | kwargs))
+
+
+def test_process_parallel_matches_serial(tmp_path):
+    serial = _get_sector_builder(tmp_path / "serial")
+    serial.process()
+    parallel = _get_sector_builder(tmp_path / "parallel")
+    parallel.process(max_processes=2)
+    assert parallel.stats == serial.stats
+    assert len(parallel.data_list) == len(serial.data_list) == 4
+    for p, s in zip(parallel.data_list, serial.data_list):
+        assert p.keys() == s.keys()
+        for key in s.keys():  # noqa: SIM118
+            # eta of noise hits is NaN
+            torch.testing.assert_close(p[key], s[key], rtol=0, atol=0, equal_nan=True)
+    # The accumulated results are not sent to the worker processes
+    assert serial._get_worker_copy().data_list == []
+    assert len(serial.data_list) == 4
+
+
+def _assert_same_data(data_list, expected_list):
+    assert len(data_list) == len(expected_list)
+    for data, expected in zip(data_list, expected_list):
+        assert data.keys() == expected.keys()
+        for key in expected.keys():  # noqa: SIM118
+            # eta of noise hits is NaN
+            torch.testing.assert_close(
+                data[key], expected[key], rtol=0, atol=0, equal_nan=True
+            )
+
+
+def test_process_cache(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    cache_dir = tmp_path / "cache"
+    uncached = _get_sector_builder(tmp_path / "uncached")
+    uncached.process()
+    first = _get_sector_builder(tmp_path / "first", cache_dir=cache_dir)
+    first.process()
+    assert len(list(cache_dir.glob("*.parquet"))) == 1
+    _assert_same_data(first.data_list, uncached.data_list)
+
+    def fail(f):
+        msg = f"Cache miss for {f}"
+        raise AssertionError(msg)
+
+    monkeypatch.setattr(pcb, "simple_data_loader", fail)
+    second = _get_sector_builder(tmp_path / "second", cache_dir=cache_dir)
+    second.process()
+    _assert_same_data(second.data_list, uncached.data_list)
+
+    # Changing a setting that affects the features needs a new cache entry
+    scaled = _get_sector_builder(
+        tmp_path / "scaled",
+        cache_dir=cache_dir,
+        feature_scale=tuple(2 for _ in pcb.DEFAULT_FEATURES),
+    )
+    with pytest.raises(AssertionError, match="Cache miss"):
+        scaled.process()
+    monkeypatch.undo()
+    scaled.process()
+    assert len(list(cache_dir.glob("*.parquet"))) == 2
+
+
+def test_process_single_file_per_event(tmp_path, monkeypatch):
+    reference = _get_sector_builder(tmp_path / "reference")
+    reference.process()
+    outdir = tmp_path / "single"
+    writer = _get_sector_builder(outdir, write_output=True, single_file_per_event=True)
+    writer.process()
+    assert [p.name for p in outdir.iterdir()] == ["data1.pt"]
+    _assert_same_data(writer.data_list, reference.data_list)
+
+    # Existing files are loaded rather than rebuilt
+    def fail(*args, **kwargs):
+        msg = "Sector was rebuilt"
+        raise AssertionError(msg)
+
+    monkeypatch.setattr(PointCloudBuilder, "sector_hits", fail)
+    skipper = _get_sector_builder(
+        outdir, write_output=True, single_file_per_event=True, redo=False
+    )
+    skipper.process()
+    _assert_same_data(skipper.data_list, reference.data_list)
+
+    dataset = TrackingDataset(outdir, point_cloud_builder=None, sectors_per_file=4)
+    assert len(dataset) == 4
+    _assert_same_data(list(dataset), reference.data_list)
+    dataset = TrackingDataset(
+        outdir, sector=2, point_cloud_builder=None, sectors_per_file=4
+    )
+    assert len(dataset) == 1
+    _assert_same_data(list(dataset), reference.data_list[2:3])
+
+
+def _sector_hits_reference(
+    builder: PointCloudBuilder, hits: pd.DataFrame, sector_id: int
+) -> tuple[np.ndarray, np.ndarray, dict[str, float]]:
+    """Per-particle reference implementation of `PointCloudBuilder.sector_hits`
+    with both ratios normalized by the total number of hits of the particle.
+    """
+    n_hits_for_pid = hits.groupby("particle_id").size()
+    theta = np.pi / builder.n_sectors
+    slope = np.arctan(theta)
+    angle = 2 * sector_id * theta
+    ur = hits.u * np.cos(angle) - hits.v * np.sin(angle)
+    vr = hits.u * np.sin(angle) + hits.v * np.cos(angle)
+    in_sector = (vr > -slope * ur) & (vr < slope * ur)
+    in_band = (vr > -builder.sector_ds * slope * ur - builder.sector_di) & (
+        vr < builder.sector_ds * slope * ur + builder.sector_di
+    )
+    ext_mask = (in_band & (ur > 0)).to_numpy()
+
+    majority_pids = set()
+    for pid, n_in_sector in hits.particle_id[in_sector].value_counts().items():
+        if pid != 0 and n_in_sector / n_hits_for_pid[pid] >= 0.5:
+            majority_pids.add(pid)
+    labels = np.array(
+        [sector_id if pid in majority_pids else -1 for pid in hits.particle_id]
+    )[ext_mask]
+
+    ext_pids = np.unique(hits.particle_id[ext_mask])
+    majority_contained = []
+    for pid in ext_pids[ext_pids != 0]:
+        group = hits.particle_id == pid
+        pt = hits.pt[group]
+        if (in_sector[group] & (pt >= builder.thld)).sum() / n_hits_for_pid[pid] < 0.5:
+            continue
+        n_ext = (in_band[group] & (pt > builder.thld)).sum()
+        majority_contained.append(n_ext == n_hits_for_pid[pid])
+    n_sector = in_sector.sum()
+    measurements = {
+        "n_hits": n_sector,
+        "n_hits_ext": ext_mask.sum(),
+        "n_hits_ratio": ext_mask.sum() / n_sector if n_sector else 0,
+        "n_unique_pids": len(ext_pids),
+        "majority_contained": (
+            np.mean(majority_contained) if majority_contained else 0
+        ),
+    }
+    return ext_mask, labels, measurements
+
+
+def test_sector_hits_measurement_mode(tmp_path):
+    builder = _get_sector_builder(tmp_path, measurement_mode=True)
+    hits = builder._load_hits(builder.prefixes[0])
+    cols = builder.get_columns(hits)
+    pid_counts = np.bincount(cols["pid_idx"])
+    for sector_id in range(builder.n_sectors):
+        mask, labels = builder.sector_hits(cols, sector_id, pid_counts)
+        ref_mask, ref_labels, ref_measurements = _sector_hits_reference(
+            builder, hits, sector_id
+        )
+        np.testing.assert_array_equal(mask, ref_mask)
+        np.testing.assert_array_equal(labels, ref_labels)
+        assert builder.measurements[-1] == pytest.approx(ref_measurements)
+    assert len(builder.measurements) == builder.n_sectors
@@ -26,6 +26,7 @@ class TestTrainCase:
     # We will replace the Nones post init
     ec_params: dict[str, Any] = None  # type: ignore
     tc_params: dict[str, Any] = None  # type: ignore
+    compile_model: bool = False
 
     def __post_init__(self):
         if self.ec_params is None:
@@ -87,6 +88,7 @@ _test_train_test_cases = [
     TestTrainCase(
         "perfectec",
     ),
+    TestTrainCase("graphtcn", compile_model=True),
 ]
 
 
@@ -158,7 +160,12 @@ def test_train(built_graphs, t: TestTrainCase) -> None:
         cluster_scanner = None
 
     loss_fct = CondensationLossTiger()
-    lmodel = TCModule(model=model, cluster_scanner=cluster_scanner, loss_fct=loss_fct)
+    lmodel = TCModule(
+        model=model,
+        cluster_scanner=cluster_scanner,
+        loss_fct=loss_fct,
+        compile_model=t.compile_model,
+    )
     logger.debug(lmodel.hparams)
     # Avoid testing with TPS
     trainer = Trainer(max_steps=1, accelerator="cpu")
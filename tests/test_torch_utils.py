@@ -0,0 +1,10 @@
+import numpy as np
+import torch
+
+from gnn_tracking.utils.torch_utils import to_numpy
+
+
+def test_to_numpy():
+    a, b = to_numpy(torch.tensor([1.0, 2.0], requires_grad=True), torch.arange(3))
+    np.testing.assert_array_equal(a, [1.0, 2.0])
+    np.testing.assert_array_equal(b, [0, 1, 2])